@@ -10,7 +10,7 @@ import requests
 import signal
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
-from rich.console import Console
+from rich.console import Console, Group
 from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.tree import Tree
@@ -52,6 +52,10 @@ class NeoClient:
         self.node_neuro: dict[str, str] = {}   # ← track neuro for each node
         self.message_history: List[Dict[str, Any]] = []
         self.exit_flag = asyncio.Event()
+        # streaming replies being rendered (assistant.delta events), by node id –
+        # parallel repliers each get their own panel inside one Live display
+        self._stream_live: Optional[Live] = None
+        self._streams: dict[str, dict] = {}
         
         # Set up signal handlers
         signal.signal(signal.SIGINT, self._handle_exit)
@@ -106,6 +110,64 @@ class NeoClient:
             console.print(f"[bold red]Error sending message:[/] {e}")
             return False
     
+    def _assistant_panel(self, text: str, timestamp: str) -> Panel:
+        """Emerald AI panel – markdown when it parses, plain text otherwise."""
+        try:
+            body = Markdown(text)
+        except Exception:
+            body = text
+        return Panel(
+            body,
+            title=f"[bold]AI[/] [dim]· {timestamp}[/]",
+            title_align="left",
+            border_style="#059669",  # Emerald border
+            style="#34d399 on #064e3b",  # Light emerald text on dark emerald background
+            expand=False,
+            padding=(1, 2),
+            box=box.ROUNDED
+        )
+
+    def _stream_render(self):
+        return Group(*(self._assistant_panel(st["text"], st["ts"]) for st in self._streams.values()))
+
+    def _stream_delta(self, node_id: str, delta: str):
+        """Grow the live AI panel of *node_id* by one streamed chunk."""
+        from datetime import datetime
+        if node_id not in self._streams:
+            self._streams[node_id] = {"text": "", "ts": datetime.now().strftime("%H:%M:%S")}
+        self._streams[node_id]["text"] += delta
+        if self._stream_live is None:
+            console.print("", style="dim")
+            self._stream_live = Live(
+                self._stream_render(),
+                console=console,
+                refresh_per_second=15,
+                transient=True
+            )
+            self._stream_live.start()
+        else:
+            self._stream_live.update(self._stream_render())
+
+    def _stream_finish(self, text: str, node_id: Optional[str] = None) -> bool:
+        """Print a node's panel with the final text; False when nothing was streaming.
+
+        The final 'assistant' event carries no node id, so without one the
+        stream whose text it continues is closed (else the oldest).
+        """
+        if node_id is None:
+            node_id = next((n for n, st in self._streams.items() if text.startswith(st["text"])),
+                           next(iter(self._streams), None))
+        st = self._streams.pop(node_id, None) if node_id is not None else None
+        if st is None:
+            return False
+        self._stream_live.console.print(self._assistant_panel(text or st["text"], st["ts"]))
+        if self._streams:
+            self._stream_live.update(self._stream_render())
+        else:
+            self._stream_live.stop()
+            self._stream_live = None
+        return True
+
     def _display_message(self, sender: str, text: str, message_type: str = "content"):
         """Display a message in the console with rich formatting
         
@@ -152,6 +214,12 @@ class NeoClient:
             if text.strip() == "🚀 task started" or text.startswith("DAG visualization"):
                 console.print(f"[dim slate_blue]{text}[/]")
                 return
+
+            # the reply was already rendered token-by-token → just finalise it
+            if self._stream_finish(text):
+                if self.config.dev_mode:
+                    console.print("", style="dim")
+                return
                 
             # Enhanced AI message panel with better styling for content
             try:
@@ -201,7 +269,9 @@ class NeoClient:
         
         # Add nodes and edges
         nodes = flow_data.get("nodes", {})
-        start_node = flow_data.get("start")
+        start_nodes = flow_data.get("start")
+        if isinstance(start_nodes, str):
+            start_nodes = [start_nodes]
         
         # Add all nodes first
         for node_id, node_data in nodes.items():
@@ -211,11 +281,17 @@ class NeoClient:
             label = f"{node_id}\n{neuro_name}\n{param_str}"
             G.add_node(node_id, label=label, neuro=neuro_name)
         
-        # Add edges
+        # Add edges – "next" may be one id or a list, "deps" point backwards
         for node_id, node_data in nodes.items():
-            next_node = node_data.get("next")
-            if next_node:
-                G.add_edge(node_id, next_node)
+            next_nodes = node_data.get("next") or []
+            if isinstance(next_nodes, str):
+                next_nodes = [next_nodes]
+            for next_node in next_nodes:
+                if next_node in nodes:
+                    G.add_edge(node_id, next_node)
+            for dep in node_data.get("deps") or []:
+                if dep in nodes:
+                    G.add_edge(dep, node_id)
         
         # Create the plot
         plt.figure(figsize=(10, 7))
@@ -243,9 +319,10 @@ class NeoClient:
         
         nx.draw_networkx_labels(G, pos, labels=labels, font_size=8, font_weight="bold")
         
-        # Highlight the start node
-        if start_node in G.nodes():
-            nx.draw_networkx_nodes(G, pos, nodelist=[start_node], 
+        # Highlight the start node(s)
+        start_nodes = [n for n in start_nodes or [] if n in G.nodes()]
+        if start_nodes:
+            nx.draw_networkx_nodes(G, pos, nodelist=start_nodes, 
                                  node_size=2200, node_color=to_rgba("orange", 0.9))
         
         plt.title("Neuro Task Flow (DAG)", size=16)
@@ -308,6 +385,11 @@ class NeoClient:
                         # Add to history
                         self.message_history.append({"sender": "assistant", "text": data})
             
+                elif topic == "assistant.delta":
+                    # token stream from a replier; the final 'assistant' event closes it
+                    if isinstance(data, dict) and data.get("delta"):
+                        self._stream_delta(data.get("id") or "", data["delta"])
+
                 elif topic == "debug":
                     await self._display_debug_info(data)
                     # Store flow data for visualization if available
@@ -334,12 +416,18 @@ class NeoClient:
                     node_id = data.get("id")
                     out     = data.get("out", {})
                     # lookup the neuro name we saved earlier
-                    neuro   = self.node_neuro.get(node_id, "‽")
+                    neuro   = data.get("neuro") or self.node_neuro.get(node_id, "‽")
+                    # restored nodes come from a checkpoint – they never start
+                    mark    = "↺" if data.get("status") == "restored" else "✓"
+
+                    # a streamed reply that never got its final 'assistant' event
+                    if node_id in self._streams:
+                        self._stream_finish("", node_id)
 
                     # trace the completion of the node with its neuro
                     self._display_message(
                         "system",
-                        f"✓ Node {node_id}   (neuro: {neuro})",
+                        f"{mark} Node {node_id}   (neuro: {neuro})",
                         message_type="technical"
                     )
 
@@ -353,6 +441,25 @@ class NeoClient:
                         self._display_message("system", f"Debug - Node Output:", message_type="debug")
                         console.print(out)
                 
+                elif topic == "task.resumed":
+                    self._display_message(
+                        "system",
+                        f"↻ Resumed interrupted task: {data.get('goal')}   "
+                        f"({data.get('done', 0)} node(s) already done)",
+                        message_type="technical"
+                    )
+
+                elif topic == "node.cancelled":
+                    node_id = data.get("id")
+                    if node_id in self._streams:
+                        self._stream_finish("", node_id)
+                    neuro   = data.get("neuro") or self.node_neuro.get(node_id, "‽")
+                    self._display_message(
+                        "system",
+                        f"✗ Node {node_id}   (neuro: {neuro}) cancelled – {data.get('reason')}",
+                        message_type="technical"
+                    )
+
                 elif topic == "node.log":
                     node_id = data.get("id")
                     neuro   = data.get("neuro")
@@ -363,6 +470,30 @@ class NeoClient:
                         message_type="debug"
                     )
                 
+                elif topic == "node.metrics" and isinstance(data, dict) and data.get("kind") == "node":
+                    # /profile perf on – one per node run
+                    self._display_message(
+                        "system",
+                        f"⚙ {data.get('neuro')} ({data.get('id')}): wall {data.get('wall_ms')} ms, "
+                        f"cpu {data.get('cpu_ms')} ms, peak {data.get('alloc_peak_kb')} KB, "
+                        f"net {data.get('alloc_net_kb')} KB"
+                        + (f" [{data.get('error')}]" if data.get("error") else ""),
+                        message_type="technical"
+                    )
+
+                elif topic == "node.metrics":
+                    # one per LLM call – only interesting while debugging
+                    if self.config.debug and isinstance(data, dict):
+                        self._display_message(
+                            "system",
+                            f"⏱ {data.get('neuro')} ({data.get('id')}) {data.get('model')}: "
+                            f"{data.get('latency_ms')} ms, ttfb {data.get('ttfb_ms')} ms, "
+                            f"tokens {data.get('prompt_tokens')}→{data.get('completion_tokens')}"
+                            + (" [cached]" if data.get("cached") else "")
+                            + (" [coalesced]" if data.get("coalesced") else ""),
+                            message_type="debug"
+                        )
+
                 elif topic == "task.done":
                     self._display_message("system", "✅ Task completed", message_type="status")
             
@@ -485,6 +616,10 @@ class NeoClient:
         table.add_row("/quit", "Exit the client (alias)")
         table.add_row("/dev on", "Enable developer mode")
         table.add_row("/dev off", "Disable developer mode")
+        table.add_row("/intent stats", "Local intent model accuracy / hit rate")
+        table.add_row("/intent retrain", "Retrain the local intent model from the logs")
+        table.add_row("/profile perf on|off", "Time / CPU / allocation profiling per node")
+        table.add_row("/profile perf stats", "Rolling per-neuro profiling table")
         table.add_row("/dag on", "Enable DAG visualization")
         table.add_row("/dag off", "Disable DAG visualization")
         table.add_row("/dag show", "Show the current task flow graph")
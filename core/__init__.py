@@ -1,2 +1,7 @@
 # Marks *core* as a Python package so inline-Python **neuros** can
 # import helpers like `core.base_brain`.
+
+# Load .env once, before any core module reads its NEO_* / OPENAI_* knobs.
+from dotenv import load_dotenv
+
+load_dotenv()
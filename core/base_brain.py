@@ -1,53 +1,355 @@
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+import asyncio, functools, os, json, time, inspect
+import httpx
+from core import context
+from core.llm_cache import cache
+from core.metrics import metrics
+from core.ratelimit import limiter
+from core.history import count_tokens
+from core.cassette import cassette
+from core.singleflight import flights
+
+# ---------------------------------------------------------------------------
+# Process-wide client registry.  One HTTP pool per base_url (sync + async)
+# and one BaseBrain per (model, temperature, base_url), so a chat turn that
+# runs several neuros re-uses warm keep-alive connections instead of paying
+# a dotenv parse and a TLS handshake per neuro call.  (.env itself is
+# loaded once by core/__init__.py.)
+# ---------------------------------------------------------------------------
+_CLIENTS    = {}        # (kind, base_url)              → OpenAI | AsyncOpenAI
+_BRAINS     = {}        # (model, temperature, base_url) → BaseBrain
+
+
+def _pool_limits() -> httpx.Limits:
+    """Pool sizes come from the environment (or .env) so ops can tune them."""
+    return httpx.Limits(
+        max_connections=int(os.getenv("NEO_LLM_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("NEO_LLM_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("NEO_LLM_KEEPALIVE_EXPIRY", "30")),
+    )
+
+
+def _shared_client(kind: str, base_url: str | None):
+    key = (kind, base_url)
+    if key not in _CLIENTS:
+        opts = dict(api_key=os.getenv("OPENAI_API_KEY"), base_url=base_url)
+
+        def build():
+            if kind == "async":
+                # retries/backoff happen in core.ratelimit, not inside the SDK
+                return AsyncOpenAI(
+                    http_client=DefaultAsyncHttpxClient(limits=_pool_limits()),
+                    max_retries=0, **opts)
+            return OpenAI(
+                http_client=DefaultHttpxClient(limits=_pool_limits()), **opts)
+
+        # record / replay mode: the real client is only built if we go live
+        _CLIENTS[key] = (cassette.wrap(build, is_async=kind == "async")
+                         if cassette.enabled else build())
+    return _CLIENTS[key]
+
+
+def _ms(start, end):
+    return round((end - start) * 1000, 1) if start is not None and end is not None else None
+
+
+def _estimate_tokens(messages) -> int:
+    return sum(count_tokens(m["content"]) + 4 for m in messages)
+
+
+def get_brain(model_name="gpt-4o-mini", temperature=0.7, base_url=None):
+    """Return the shared BaseBrain for this (model, temperature, base_url)."""
+    base_url = base_url or os.getenv("OPENAI_BASE_URL") or None
+    key = (model_name, temperature, base_url)
+    if key not in _BRAINS:
+        _BRAINS[key] = BaseBrain(model_name, temperature, base_url=base_url)
+    return _BRAINS[key]
+
+
+async def aclose_clients():
+    """Close every pooled connection – call once on server shutdown."""
+    clients = list(_CLIENTS.values())
+    _CLIENTS.clear()
+    _BRAINS.clear()
+    for c in clients:
+        closed = c.close()
+        if inspect.isawaitable(closed):
+            await closed
+
+
+def _on_server_loop(fn):
+    """
+    Neuros with ``"executor": "thread"`` run on a pool thread's own event
+    loop (see core.neuro_pool).  Their LLM calls are sent back to the server
+    loop, where the pooled client, rate limiter and single-flight live.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kw):
+        home = context.get("loop")
+        if home is None or home is asyncio.get_running_loop():
+            return await fn(*args, **kw)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(fn(*args, **kw), home))
+    return wrapper
+
 
 class BaseBrain:
-    def __init__(self, model_name="gpt-4o-mini", temperature=0.7):
-        load_dotenv()
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(self, model_name="gpt-4o-mini", temperature=0.7, base_url=None):
+        self.base_url = base_url
         self.model  = model_name
         self.temp   = temperature
 
+    @property
+    def aclient(self):
+        return _shared_client("async", self.base_url)
+
+    @property
+    def client(self):
+        # sync client – only touched by the legacy shims below
+        return _shared_client("sync", self.base_url)
+
     # internal
-    def _call(self, messages, *, json_mode: bool):
+    def _params(self, json_mode: bool):
         params = dict(model=self.model, temperature=self.temp)
         if json_mode:
             params["response_format"] = {"type": "json_object"}
-        rsp = self.client.chat.completions.create(messages=messages, **params)
+        return params
+
+    @staticmethod
+    def _timeout() -> dict:
+        # the request may not outlive the turn's deadline
+        left = context.remaining()
+        return {} if left is None else {"timeout": max(left, 0.001)}
+
+    def _cache_key(self, messages, params):
+        """Cache key for this call, or None when the calling neuro opted out."""
+        if not cache.enabled or not context.get("cache"):
+            return None
+        return cache.key(self.model, self.temp, messages, params.get("response_format"))
+
+    def _cache_put(self, key, value):
+        if key and value:
+            pol = context.get("cache")
+            cache.put(key, value, ttl=pol.get("ttl"), disk=pol.get("disk", True))
+
+    # ---------- accounting ----------------------------------------------
+    # ``info`` is filled by whoever actually talks to the API:
+    #   sent  – request issued      first – headers / first token
+    #   usage – rsp.usage
+    # A caller whose info stays empty was served by someone else's call.
+    def _sample(self, t0, info, *, cached=False, error=None):
+        end   = time.perf_counter()
+        sent  = info.get("sent")
+        usage = info.get("usage")
+        return {
+            "cid":               context.get("cid"),
+            "node":              context.get("node"),
+            "neuro":             context.get("neuro"),
+            "model":             self.model,
+            "queue_ms":          _ms(t0, sent if sent is not None else (None if cached else end)),
+            "ttfb_ms":           _ms(sent, info.get("first")),
+            "latency_ms":        _ms(t0, end),
+            "prompt_tokens":     getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "cached":            cached,
+            "coalesced":         not cached and sent is None,
+            "retries":           info.get("retries", 0),
+            "error":             error,
+        }
+
+    async def _report(self, t0, info, **kw):
+        sample = self._sample(t0, info, **kw)
+        metrics.record(sample)
+        pub = context.get("pub")
+        if pub:
+            await pub("node.metrics", {"id": sample["node"], "kind": "llm", **sample})
+
+    async def _acall(self, messages, *, json_mode: bool):
+        t0, info = time.perf_counter(), {}
+        params = self._params(json_mode)
+        key    = self._cache_key(messages, params)
+        if key:
+            hit = await cache.aget(key, disk=context.get("cache").get("disk", True))
+            if hit is not None:
+                await self._report(t0, info, cached=True)
+                return hit
+
+        # identical requests already in flight share one API call
+        flight = f"{self.base_url}|" + (key or cache.key(
+            self.model, self.temp, messages, params.get("response_format")))
+        try:
+            out = await flights.do(flight, lambda: self._fetch(messages, params, info))
+        except Exception as e:
+            await self._report(t0, info, error=type(e).__name__)
+            raise
+        self._cache_put(key, out)
+        await self._report(t0, info)
+        return out
+
+    async def _fetch(self, messages, params, info):
+        lim = limiter.model(self.model)
+        est = _estimate_tokens(messages)
+
+        async def attempt():
+            # concurrency slot + rpm/tpm budget, then one request
+            async with lim.slot(est):
+                info["sent"] = time.perf_counter()
+                # streaming response wrapper → we see the headers before the body
+                async with self.aclient.chat.completions.with_streaming_response.create(
+                        messages=messages, **params, **self._timeout()) as raw:
+                    info["first"] = time.perf_counter()
+                    rsp = await raw.parse()
+            lim.settle(est, rsp.usage)
+            return rsp
+
+        rsp = await limiter.retry(self.model, attempt, info)
+        info["usage"] = rsp.usage
         return rsp.choices[0].message.content.strip()
 
-    # helpers
-    def generate_json(self, user_msg: str, system_prompt: str):
-        msgs = [{"role": "system", "content": system_prompt},
+    async def _astream(self, messages, params, info):
+        lim = limiter.model(self.model)
+        est = _estimate_tokens(messages)
+        async with lim.slot(est):
+            async def attempt():
+                info["sent"] = time.perf_counter()
+                return await self.aclient.chat.completions.create(
+                    messages=messages, stream=True,
+                    stream_options={"include_usage": True}, **params, **self._timeout())
+
+            # only opening the stream is retried – once tokens have been
+            # forwarded to the client there is no taking them back
+            stream = await limiter.retry(self.model, attempt, info)
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    info["usage"] = chunk.usage          # final, choice-less chunk
+                if chunk.choices and chunk.choices[0].delta.content:
+                    info.setdefault("first", time.perf_counter())
+                    yield chunk.choices[0].delta.content
+        lim.settle(est, info.get("usage"))
+
+    def _call(self, messages, *, json_mode: bool):
+        # legacy blocking path – only used by the sync shims below
+        t0, info = time.perf_counter(), {}
+        params = self._params(json_mode)
+        key    = self._cache_key(messages, params)
+        if key:
+            hit = cache.get(key, disk=context.get("cache").get("disk", True))
+            if hit is not None:
+                metrics.record(self._sample(t0, info, cached=True))
+                return hit
+
+        info["sent"] = time.perf_counter()
+        with self.client.chat.completions.with_streaming_response.create(
+                messages=messages, **params, **self._timeout()) as raw:
+            info["first"] = time.perf_counter()
+            rsp = raw.parse()
+        info["usage"] = rsp.usage
+        out = rsp.choices[0].message.content.strip()
+        self._cache_put(key, out)
+        metrics.record(self._sample(t0, info))
+        return out
+
+    @staticmethod
+    def _json_msgs(user_msg: str, system_prompt: str):
+        return [{"role": "system", "content": system_prompt},
                 {"role": "user",   "content": "Respond only with a JSON object.\n\n" + user_msg}]
-        return self._call(msgs, json_mode=True)
 
-    def generate_text(self, user_msg: str, system_prompt: str):
-        msgs = [{"role": "system", "content": system_prompt},
+    @staticmethod
+    def _text_msgs(user_msg: str, system_prompt: str):
+        return [{"role": "system", "content": system_prompt},
                 {"role": "user",   "content": user_msg}]
-        return self._call(msgs, json_mode=False)
+
+    # ------------------------------------------------------------------
+    # async helpers – what every neuro should await
+    # ------------------------------------------------------------------
+    @_on_server_loop
+    async def agenerate_json(self, user_msg: str, system_prompt: str):
+        return await self._acall(self._json_msgs(user_msg, system_prompt), json_mode=True)
+
+    @_on_server_loop
+    async def agenerate_text(self, user_msg: str, system_prompt: str, *, stream: bool = False):
+        """
+        With ``stream=True`` tokens are forwarded as ``assistant.delta`` events
+        while the completion is generated (only when running under the
+        Executor – elsewhere there is nobody to stream to).  The full text is
+        returned either way.
+        """
+        msgs = self._text_msgs(user_msg, system_prompt)
+        pub  = context.get("pub")
+        if not (stream and pub):
+            return await self._acall(msgs, json_mode=False)
+
+        t0, info = time.perf_counter(), {}
+
+        async def _emit(delta):
+            await pub("assistant.delta", {
+                "id":    context.get("node"),
+                "neuro": context.get("neuro"),
+                "delta": delta,
+            })
+
+        params = self._params(False)
+        key    = self._cache_key(msgs, params)
+        if key:
+            hit = await cache.aget(key, disk=context.get("cache").get("disk", True))
+            if hit is not None:
+                await _emit(hit)
+                await self._report(t0, info, cached=True)
+                return hit
+
+        parts = []
+        try:
+            async for delta in self._astream(msgs, params, info):
+                parts.append(delta)
+                await _emit(delta)
+        except Exception as e:
+            await self._report(t0, info, error=type(e).__name__)
+            raise
+        out = "".join(parts).strip()
+        self._cache_put(key, out)
+        await self._report(t0, info)
+        return out
+
+    async def astream_text(self, user_msg: str, system_prompt: str):
+        """Yield the completion chunk by chunk (no caching, no events)."""
+        home = context.get("loop")
+        if home is not None and home is not asyncio.get_running_loop():
+            # off the server loop (thread-pool neuro) – one chunk, see _on_server_loop
+            yield await self.agenerate_text(user_msg, system_prompt)
+            return
+        t0, info = time.perf_counter(), {}
+        msgs = self._text_msgs(user_msg, system_prompt)
+        async for delta in self._astream(msgs, self._params(False), info):
+            yield delta
+        metrics.record(self._sample(t0, info))
+
+    # ------------------------------------------------------------------
+    # sync shims – kept for neuros written against the old API.  They
+    # block the event loop, so new code should use the a* variants.
+    # ------------------------------------------------------------------
+    def generate_json(self, user_msg: str, system_prompt: str):
+        return self._call(self._json_msgs(user_msg, system_prompt), json_mode=True)
+
+    def generate_text(self, user_msg: str, system_prompt: str):
+        return self._call(self._text_msgs(user_msg, system_prompt), json_mode=False)
 
     # ------------------------------------------------------------------
     # Planner helper – used by code_planner, dev_planner, etc.
     # ------------------------------------------------------------------
-    async def plan(self, query, *, system_prompt: str = ""):
+    async def aplan(self, query, *, system_prompt: str = ""):
         """
         Convenience wrapper: run the LLM in *JSON mode* and give back the
         parsed Python object, so planner neuros can simply do
 
-            plan = await llm.plan(payload)
+            plan = await llm.aplan(payload)
 
         Without repeating json.dumps / json.loads every time.
         """
-        import json
-
         # normalise input
         if not isinstance(query, str):
             query = json.dumps(query, ensure_ascii=False)
 
         # get raw JSON from the model…
-        raw = self.generate_json(query, system_prompt=system_prompt)
+        raw = await self.agenerate_json(query, system_prompt=system_prompt)
 
         # …and return a Python object (or a safe fallback)
         try:
@@ -59,3 +361,6 @@ class BaseBrain:
                 "missing": [],
                 "question": "Sorry – I produced invalid JSON. Could you rephrase?"
             }
+
+    # old name, already async
+    plan = aplan
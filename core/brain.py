@@ -1,12 +1,60 @@
-import asyncio, json, os
+import asyncio, json, os, time, uuid
 from core.neuro_factory import NeuroFactory
 from core.executor      import Executor
+from core.flow_compiler import FlowError, compile_flow
 from core.conversation  import Conversation
 from core.pubsub        import hub
+from core.history       import history, settings as history_settings
+from core               import context, logcapture
+from core.intent_model  import intent_model
+from core.plan_cache    import plan_cache
+from core.run_store     import runs
+from core.profiler      import profiler
 import json
 
 import os, json
 
+# how many neuros the planner sees per turn (0 = all of them)
+CATALOGUE_TOP_K = int(os.getenv("NEO_CATALOGUE_TOP_K", "12"))
+
+# wall-clock budget for one turn – planning, execution and every LLM call
+# (profile "turn_timeout" overrides; 0 = unbounded)
+TURN_TIMEOUT = float(os.getenv("NEO_TURN_TIMEOUT", "0"))
+
+# high-volume events – published without a console trace
+_QUIET_TOPICS = {"assistant.delta", "node.metrics"}
+
+# intents that switch profile – the turn ends without a plan
+TOGGLE_INTENTS = {"dev_on", "dev_off", "code_on", "code_off", "general_on", "general_off"}
+
+
+class _Speculation:
+    """How often the planner started next to intent_classifier was kept."""
+    def __init__(self):
+        self.counters = {"started": 0, "kept": 0, "cancelled": 0, "saved_ms": 0.0}
+
+    def stats(self) -> dict:
+        started = self.counters["started"]
+        return {**self.counters,
+                "saved_ms": round(self.counters["saved_ms"], 1),
+                "hit_rate": round(self.counters["kept"] / started, 4) if started else 0.0}
+
+
+speculation = _Speculation()
+
+
+def _drop(task):
+    """Cancel a speculative task we no longer need (and swallow its outcome)."""
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+async def _timed(coro):
+    t0 = time.perf_counter()
+    out = await coro
+    return out, time.perf_counter() - t0
+
+
 class Brain:
     def __init__(self, factory=None):
         
@@ -25,16 +73,27 @@ class Brain:
         self.listeners.setdefault(cid, []).append(cb)
 
     async def _pub(self, cid, topic, data):
-        # publish to websocket hub
-        print(f"[BRAIN] Publishing to hub queue: {cid}, topic: {topic}")
+        # publish to websocket hub.  Neuros publish from inside their run
+        # (deltas, LLM metrics) while logcapture holds their stdout, so the
+        # trace goes to the real console – never into the node's log.
+        quiet = topic in _QUIET_TOPICS
+        if not quiet:
+            logcapture.console(f"[BRAIN] Publishing to hub queue: {cid}, topic: {topic}")
         await hub.queue(cid).put({"topic": topic, "data": data})
-        print(f"[BRAIN] Published to hub queue successfully: {cid}, topic: {topic}")
+        if not quiet:
+            logcapture.console(f"[BRAIN] Published to hub queue successfully: {cid}, topic: {topic}")
         for cb in self.listeners.get(cid, []):
-            print(f"[BRAIN] Calling listener callback for: {cid}")
+            if not quiet:
+                logcapture.console(f"[BRAIN] Calling listener callback for: {cid}")
             await cb(topic, data)
 
   
 
+    def _warm(self, cfg):
+        """Compile the neuros every turn of this profile needs (see NeuroFactory.warm)."""
+        self.factory.warm(cfg.get("warm") or [cfg.get("planner", "planner"),
+                                              cfg.get("replier", "reply"), "intent_classifier"])
+
     def _profile_cfg(self, cid):
         # first time: default to “general”
         if cid not in self.active_profile:
@@ -47,6 +106,7 @@ class Brain:
                 raise FileNotFoundError(f"Profile '{name}' not found")
             with open(path, "r", encoding="utf-8") as f:
                 self.profile_cfg[cid] = json.load(f)
+            self._warm(self.profile_cfg[cid])
 
         # ↳ restrict visible neuros for this conversation
         self.factory.set_pattern(
@@ -63,6 +123,7 @@ class Brain:
         with open(path, "r", encoding="utf-8") as f:
             self.profile_cfg[cid]    = json.load(f)
         self.active_profile[cid] = name
+        self._warm(self.profile_cfg[cid])
         # turn on “dev” neuros if we’re in neuro_dev (or code_dev) profile
         self.dev_flag[cid] = (name in ("neuro_dev", "code_dev"))
 
@@ -72,7 +133,87 @@ class Brain:
             self.profile_cfg[cid].get("neuros", ["*"])
         )
 
+    async def _execute(self, exe: Executor, plan_key, goal: str, flow: dict, from_cache: bool):
+        """Run the flow; remember it if it worked, forget it if it had to be re-planned."""
+        await exe.run()
+        if not plan_key:
+            return
+        if exe.replanned or exe.counts["failed"]:
+            if from_cache:
+                plan_cache.evict(plan_key)
+        elif not from_cache:
+            plan_cache.put(plan_key, goal, flow)
+
+    async def _intent_command(self, cmd: str) -> str:
+        parts = cmd.split()
+        if len(parts) > 1 and parts[1] == "retrain":
+            # CPU-bound NumPy fit – keep it off the event loop
+            rep = await asyncio.to_thread(intent_model.train)
+            if not rep.get("ok"):
+                return f"intent model not trained: {rep['reason']}."
+            return (f"intent model retrained on {rep['examples']} examples "
+                    f"({len(rep['intents'])} intents): held-out accuracy {rep['accuracy']}, "
+                    f"coverage {rep['coverage']} at threshold {intent_model.threshold}.")
+        return "```json\n" + json.dumps(intent_model.stats(), indent=2) + "\n```"
+
+    def _deadline(self, cid):
+        secs = float(self._profile_cfg(cid).get("turn_timeout", TURN_TIMEOUT))
+        return asyncio.get_running_loop().time() + secs if secs else None
+
+    async def resume(self, rec: dict) -> bool:
+        """Continue a task the previous server process left unfinished (see core.run_store)."""
+        cid   = rec["cid"]
+        nodes = rec["flow"].get("nodes", {})
+        # nodes that were mid-run will run again – only safe when idempotent
+        unsafe = [n for n in rec["running"]
+                  if nodes.get(n, {}).get("neuro") not in self.factory.idempotent]
+        if unsafe:
+            runs.drop(rec["id"])
+            runs.counters["abandoned"] += 1
+            print(f"[BRAIN] Not resuming task {rec['id']} for {cid}: {unsafe} not idempotent")
+            await self._pub(cid, "assistant",
+                            "⚠️ A task was interrupted by a restart and could not be resumed.")
+            return False
+
+        try:
+            self._apply_profile(cid, rec.get("profile") or "general")
+        except FileNotFoundError:
+            self._apply_profile(cid, "general")
+        cfg  = self._profile_cfg(cid)
+        conv = self.convs.setdefault(cid, Conversation(cid))
+        state = {
+            **rec["state"],
+            "__factory": self.factory,
+            "__history": history.render(conv, **history_settings(cfg)),
+            "__conv":    conv,
+            "__profile_history": cfg.get("history"),
+            "__dev":     self.dev_ctx.setdefault(cid, {}),
+        }
+        exe = Executor(rec["flow"], self.factory, state,
+                       lambda t, d: self._pub(cid, t, d), run_id=rec["id"])
+        exe.checkpoints = rec["checkpoints"]
+        print(f"[BRAIN] Resuming task {rec['id']} for {cid} ({len(exe.checkpoints)} node(s) done)")
+        with context.scope(deadline=self._deadline(cid)):
+            self.tasks[cid] = (self.loop.create_task(exe.run()), state)
+        runs.counters["resumed"] += 1
+        await self._pub(cid, "task.resumed", {"id": rec["id"], "goal": state.get("goal"),
+                                              "done": len(exe.checkpoints)})
+        return True
+
     async def handle(self, cid: str, user_text: str) -> str:
+        """One turn under a deadline that the executor task inherits."""
+        deadline = self._deadline(cid)
+        with context.scope(deadline=deadline):
+            try:
+                async with asyncio.timeout_at(deadline) as tm:
+                    return await self._handle(cid, user_text)
+            except TimeoutError:
+                if not tm.expired():
+                    raise
+                print(f"[BRAIN] Turn for {cid} ran out of time before execution")
+                return "⏱ Planning took too long – please try again."
+
+    async def _handle(self, cid: str, user_text: str) -> str:
         dev_ctx = self.dev_ctx.setdefault(cid, {})
         # ensure we have a profile
         cfg = self._profile_cfg(cid)
@@ -91,6 +232,13 @@ class Brain:
 
         # handle profile commands -----------------------------
         cmd = user_text.lower().strip()
+        # per-node profiling: /profile perf on | off | stats
+        if cmd.startswith("/profile perf"):
+            arg = cmd.split()[2] if len(cmd.split()) > 2 else "stats"
+            if arg in ("on", "off"):
+                profiler.enable(cid, arg == "on")
+                return f"node profiling {arg} for this conversation."
+            return profiler.table()
         if cmd.startswith("/profile"):
             parts = cmd.split(maxsplit=1)
             if len(parts) == 1:
@@ -102,6 +250,10 @@ class Brain:
             except FileNotFoundError:
                 return f"unknown profile '{name}'."
 
+        # local intent model: /intent stats | /intent retrain
+        if cmd.startswith("/intent"):
+            return await self._intent_command(cmd)
+
         # compatibility: /dev on | off map to profiles
         if cmd == "/dev on":
             self._apply_profile(cid, "neuro_dev")
@@ -110,9 +262,8 @@ class Brain:
             self._apply_profile(cid, "general")
             return "Back to general profile."
 
-        # pass the full conversation history instead of just the last 10 turns
-        hist = "\n".join(f"{m['sender']}: {m['text']}"
-                        for m in conv.history())  # no arg = all messages
+        # token-budgeted window: rolling summary + last K turns verbatim
+        hist = history.render(conv, **history_settings(cfg))
 
         # build a simple neuros list for the LLM
         dev = self.dev_flag.get(cid, False)
@@ -123,16 +274,66 @@ class Brain:
             "__factory": self.factory,
             "__history":  hist,
             "__neuros_md": neuros_md,
+            "__profile_history": cfg.get("history"),
             "__dev": dev_ctx,
         }
 
-        # ── 0.  classify intent first ───────────────────────────────
-        ic_out  = await self.factory.run(
-                        "intent_classifier",
-                        shared_state,
-                        history=hist,
-                        text=user_text)
-        intent  = ic_out.get("intent", "generic")
+        # LLM calls made before the executor takes over (intent, plan) still
+        # report their node.metrics to this conversation
+        pub = lambda t, d: self._pub(cid, t, d)
+
+        # ── 0.  classify intent – and speculatively plan at the same time ──
+        # The planner only uses the intent as a hint, so unless the profile
+        # opts out ("speculative_plan": false) it starts right away and is
+        # cancelled if the intent turns out to be a toggle or a fast-path one.
+        # Each run gets its own copy of the state (__llm / __prompt are per neuro).
+        fast_intents = set(cfg.get("fast_path_intents", []))
+        # planners only see the top-k neuros for this goal (full list if unsure)
+        cat          = self.factory.relevant(
+            cid, user_text,
+            k=cfg.get("catalogue_top_k", CATALOGUE_TOP_K),
+            pin=[replier_neuro, *cfg.get("catalogue_pin", [])],
+            min_score=cfg.get("catalogue_min_score", 1.0))
+        plan_task    = None
+
+        # plan cache: same goal template + profile + neuro versions → same DAG
+        plan_key = None
+        cached   = None
+        if cfg.get("plan_cache", True):
+            plan_key = plan_cache.key(user_text, self.active_profile.get(cid, "general"),
+                                      self.factory.fingerprint(cid))
+            cached   = plan_cache.get(plan_key, user_text) if plan_key else None
+
+        # a confident local prediction skips the classifier LLM call entirely
+        intent = intent_model.classify(user_text, cfg.get("intent_threshold"))
+        if intent is None:
+            with context.scope(cid=cid, pub=pub):
+                ic_task = asyncio.ensure_future(_timed(self.factory.run(
+                                "intent_classifier",
+                                dict(shared_state),
+                                history=hist,
+                                text=user_text)))
+                if cfg.get("speculative_plan", True) and cached is None:
+                    plan_task = asyncio.ensure_future(_timed(self.factory.run(
+                        planner_name, dict(shared_state),
+                        goal=user_text,
+                        catalogue=cat,
+                        intent=None)))
+                    speculation.counters["started"] += 1
+            try:
+                ic_out, ic_secs = await ic_task
+            except BaseException:
+                if plan_task:
+                    _drop(plan_task)
+                raise
+            intent  = ic_out.get("intent", "generic")
+            # every LLM label is a training example for the local model
+            intent_model.log(user_text, intent)
+
+            if plan_task and (intent in TOGGLE_INTENTS or intent in fast_intents):
+                _drop(plan_task)
+                speculation.counters["cancelled"] += 1
+                plan_task = None
 
         # ── automatic profile toggling ──────────────────────────
         current_profile = self.active_profile.get(cid, "code_dev")  # Default to code_dev
@@ -193,18 +394,31 @@ class Brain:
             conv.add("assistant", reply)
             return reply
 
-        # Let greetings / small-talk follow the normal planner pipeline
-        # so we still get node events and a single traced reply panel.
+        # Greetings / small-talk still run through the Executor (a single
+        # replier node) so we keep node events and a single traced reply panel.
 
         # 2. ask the (dev_)planner for a task-flow
-        cat           = self.factory.catalogue(cid)
-        plan = (await self.factory.run(
-            planner_name, shared_state,
-            goal=user_text,
-            catalogue=cat,
-            intent=intent)              # ← pass hint to planner
-        )["plan"]
-        await self._pub(cid, "debug", {"stage": "plan", "plan": plan})
+        from_cache = False
+        if intent in fast_intents:
+            # profile's fast path – no planner round trip at all
+            plan = {"ok": True, "flow": {"type": "reply"}, "missing": [], "question": None}
+        elif cached is not None:
+            plan, from_cache = {"ok": True, "flow": cached, "missing": [], "question": None}, True
+        elif plan_task:
+            out, plan_secs = await plan_task
+            plan = out["plan"]
+            speculation.counters["kept"] += 1
+            # sequential would have cost ic + plan; we paid roughly the max
+            speculation.counters["saved_ms"] += min(ic_secs, plan_secs) * 1000
+        else:
+            with context.scope(cid=cid, pub=pub):
+                plan = (await self.factory.run(
+                    planner_name, shared_state,
+                    goal=user_text,
+                    catalogue=cat,
+                    intent=intent)              # ← pass hint to planner
+                )["plan"]
+        await self._pub(cid, "debug", {"stage": "plan", "plan": plan, "cached": from_cache})
 
         # ─────────────────────────────────────────────────────────
         # Some planners mistakenly wrap their real status one level
@@ -279,7 +493,19 @@ class Brain:
         # 4. if planner gave us a valid flow, run it (even single-node short-form)
         flow = plan.get("flow")
         if plan.get("ok") and isinstance(flow, dict) and "start" in flow and "nodes" in flow:
+            # resolve names, check params, reject cycles – before any node runs
+            try:
+                compiled = compile_flow(flow, self.factory)
+            except FlowError as e:
+                print(f"[BRAIN] Rejected flow: {e}")
+                if from_cache:
+                    plan_cache.evict(plan_key)
+                msg = "⚠️ Planner produced an invalid flow:\n" + "\n".join(f"- {p}" for p in e.problems)
+                conv.add("assistant", msg)
+                return msg
+            flow = compiled.flow()
             # executor will read __planner when it needs to re-plan
+            run_id = uuid.uuid4().hex
             state = {
                 "goal":      user_text,
                 "__factory": self.factory,
@@ -287,13 +513,25 @@ class Brain:
                 "__conv":    conv,
                 "__cid":     cid,          # Make cid available to executor
                 "__dev":     dev_ctx,
-                "__planner": planner_name
+                "__planner": planner_name,
+                "__profile": self.active_profile.get(cid, "general"),
+                "__profile_history": cfg.get("history"),   # neuros merge their own over it
+                "__run":     run_id,       # durable progress, see core.run_store
             }
             print(f"[BRAIN] Creating executor with flow: {flow}")
-            exe = Executor(flow, self.factory, state,
-                           lambda t, d: self._pub(cid, t, d))
+            exe = Executor(compiled, self.factory, state,
+                           lambda t, d: self._pub(cid, t, d), run_id=run_id)
             print(f"[BRAIN] Created task executor, starting execution")
-            self.tasks[cid] = (self.loop.create_task(exe.run()), state)
+            # only planner-made flows are worth caching (not the fast-path reply)
+            learn = plan_key if intent not in fast_intents else None
+            # a new turn supersedes the previous one – stop it and free its slots
+            prev = self.tasks.get(cid)
+            if prev and not prev[0].done():
+                print(f"[BRAIN] Cancelling superseded task for {cid}")
+                runs.drop(prev[1].get("__run"))
+                prev[0].cancel()
+            self.tasks[cid] = (self.loop.create_task(
+                self._execute(exe, learn, user_text, flow, from_cache)), state)
             print(f"[BRAIN] Created task and stored in tasks dictionary")
             await self._pub(cid, "debug", {"stage": "execute"})
             print(f"[BRAIN] Published debug event, returning task started message")
@@ -0,0 +1,390 @@
+"""
+Record / replay of OpenAI calls ("cassettes") for offline, repeatable runs.
+
+    NEO_LLM_CASSETTE_MODE = off | record | replay | auto
+    NEO_LLM_CASSETTE      = .cache/llm_cassette.jsonl
+    NEO_LLM_CASSETTE_LATENCY = recorded | 0 | fixed:0.3 | uniform:0.1,0.6
+                               | normal:0.4,0.1 | lognormal:-1,0.5
+    NEO_LLM_CASSETTE_SEED = 0
+
+``record`` calls the real API and appends every request/response pair
+(with its measured time-to-first-byte and total latency) to the cassette.
+``replay`` serves them back by request hash and never touches the network;
+an unknown request raises ``CassetteMiss``.  ``auto`` replays what it has
+and records the rest.  Identical requests recorded several times are
+replayed in recording order.
+
+The cassette wraps the OpenAI *client*, so the response cache,
+single-flight, rate limiter and metrics above it behave exactly as they
+do live – only the network is swapped out.  Used by BaseBrain and by
+lib/video_gen (chat, images, speech).
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+# request fields that do not change the answer
+_IGNORED = {"stream_options", "timeout", "extra_headers", "extra_query", "extra_body"}
+
+
+class CassetteMiss(LookupError):
+    pass
+
+
+def _dump(obj):
+    return obj.model_dump() if hasattr(obj, "model_dump") else obj
+
+
+def _ns(obj):
+    """JSON → attribute access, the way the SDK's pydantic models read."""
+    if isinstance(obj, dict):
+        return SimpleNamespace(**{k: _ns(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return [_ns(v) for v in obj]
+    return obj
+
+
+class _Binary:
+    """Stand-in for the SDK's binary response (audio.speech)."""
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def read(self) -> bytes:
+        return self.content
+
+    def write_to_file(self, path):
+        with open(path, "wb") as f:
+            f.write(self.content)
+
+    stream_to_file = write_to_file
+
+
+def _sampler(spec: str, rng: random.Random):
+    """Parse NEO_LLM_CASSETTE_LATENCY; None means "use the recorded timings"."""
+    spec = (spec or "recorded").strip().lower()
+    if spec == "recorded":
+        return None
+    if spec in ("0", "none", "off"):
+        return lambda: 0.0
+    name, _, raw = spec.partition(":")
+    a = [float(x) for x in raw.split(",") if x]
+    return {
+        "fixed":     lambda: a[0],
+        "uniform":   lambda: rng.uniform(a[0], a[1]),
+        "normal":    lambda: max(0.0, rng.gauss(a[0], a[1])),
+        "lognormal": lambda: rng.lognormvariate(a[0], a[1]),
+    }[name]
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = "off", latency: str = "recorded",
+                 seed: int | None = None):
+        self.path    = path
+        self.mode    = mode if mode in ("record", "replay", "auto") else "off"
+        self.rng     = random.Random(seed)
+        self.sample  = _sampler(latency, self.rng)
+        self._tapes: dict[str, list[dict]] | None = None
+        self._cursor: dict[str, int] = {}
+        self._lock   = threading.Lock()
+        self.counters = {"played": 0, "recorded": 0, "missed": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    # ---------- storage ---------------------------------------------------
+    @staticmethod
+    def key(kind: str, request: dict) -> str:
+        req  = {k: v for k, v in request.items() if k not in _IGNORED}
+        blob = json.dumps({"kind": kind, "request": req}, sort_keys=True,
+                          ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _load(self) -> dict[str, list[dict]]:
+        if self._tapes is None:
+            self._tapes = {}
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self._tapes.setdefault(entry["key"], []).append(entry)
+        return self._tapes
+
+    def find(self, kind: str, request: dict) -> dict | None:
+        """The next recorded entry for this request, or None if it should go live."""
+        if self.mode == "record":
+            return None
+        key = self.key(kind, request)
+        with self._lock:
+            tape = self._load().get(key)
+            if not tape:
+                self.counters["missed"] += 1
+                if self.mode == "replay":
+                    raise CassetteMiss(
+                        f"no recorded {kind} response for request {key[:12]} in {self.path}")
+                return None
+            i = self._cursor.get(key, 0)
+            self._cursor[key] = i + 1
+            self.counters["played"] += 1
+            return tape[min(i, len(tape) - 1)]
+
+    def record(self, kind: str, request: dict, response, *, ttfb: float, total: float,
+               chunks: list | None = None):
+        entry = {
+            "key":      self.key(kind, request),
+            "kind":     kind,
+            "request":  {k: v for k, v in request.items() if k not in _IGNORED},
+            "response": response,
+            "latency":  {"ttfb": round(ttfb, 4), "total": round(total, 4)},
+        }
+        if chunks is not None:
+            entry["chunks"] = chunks
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+            self._load().setdefault(entry["key"], []).append(entry)
+            self.counters["recorded"] += 1
+
+    def delays(self, entry: dict) -> tuple[float, float]:
+        """(time to first byte, total) to wait when replaying *entry*."""
+        rec   = entry.get("latency") or {}
+        ttfb  = rec.get("ttfb", 0.0)
+        total = rec.get("total", ttfb)
+        if self.sample is None:
+            return ttfb, max(total, ttfb)
+        t = self.sample()
+        return (t * ttfb / total if total else t), t
+
+    def wrap(self, build, *, is_async: bool):
+        """Client facade; ``build`` makes the real client (only if we go live)."""
+        return CassetteClient(self, build, is_async)
+
+    def stats(self) -> dict:
+        return {**self.counters, "mode": self.mode, "path": self.path}
+
+
+# ---------------------------------------------------------------------------
+# Client facade – just the surface Neo uses:
+#   chat.completions.create(…)                       (sync / async, also stream=True)
+#   chat.completions.with_streaming_response.create  (sync / async)
+#   images.generate(…)   audio.speech.create(…)
+# ---------------------------------------------------------------------------
+class CassetteClient:
+    def __init__(self, tape: Cassette, build, is_async: bool):
+        self._tape, self._build, self._async = tape, build, is_async
+        self._real  = None
+        completions = _Completions(self)
+        self.chat   = SimpleNamespace(completions=completions)
+        self.images = SimpleNamespace(generate=lambda **kw: self._simple("images", kw))
+        self.audio  = SimpleNamespace(speech=SimpleNamespace(
+            create=lambda **kw: self._simple("speech", kw)))
+
+    @property
+    def real(self):
+        if self._real is None:
+            self._real = self._build()
+        return self._real
+
+    def close(self):
+        if self._real is not None:
+            return self._real.close()
+        return asyncio.sleep(0) if self._async else None
+
+    # ---------- images / speech / plain chat ------------------------------
+    def _simple(self, kind, kw):
+        return self._asimple(kind, kw) if self._async else self._ssimple(kind, kw)
+
+    def _live(self, kind):
+        return {
+            "chat":   lambda: self.real.chat.completions.create,
+            "images": lambda: self.real.images.generate,
+            "speech": lambda: self.real.audio.speech.create,
+        }[kind]()
+
+    @staticmethod
+    def _encode(kind, rsp):
+        if kind == "speech":
+            return {"b64": base64.b64encode(rsp.content).decode()}
+        return _dump(rsp)
+
+    @staticmethod
+    def _decode(kind, data):
+        if kind == "speech":
+            return _Binary(base64.b64decode(data["b64"]))
+        return _ns(data)
+
+    def _ssimple(self, kind, kw):
+        entry = self._tape.find(kind, kw)
+        if entry:
+            time.sleep(self._tape.delays(entry)[1])
+            return self._decode(kind, entry["response"])
+        t0  = time.perf_counter()
+        rsp = self._live(kind)(**kw)
+        dt  = time.perf_counter() - t0
+        self._tape.record(kind, kw, self._encode(kind, rsp), ttfb=dt, total=dt)
+        return rsp
+
+    async def _asimple(self, kind, kw):
+        entry = self._tape.find(kind, kw)
+        if entry:
+            await asyncio.sleep(self._tape.delays(entry)[1])
+            return self._decode(kind, entry["response"])
+        t0  = time.perf_counter()
+        rsp = await self._live(kind)(**kw)
+        dt  = time.perf_counter() - t0
+        self._tape.record(kind, kw, self._encode(kind, rsp), ttfb=dt, total=dt)
+        return rsp
+
+
+class _Completions:
+    def __init__(self, client: CassetteClient):
+        self._c = client
+        self.with_streaming_response = SimpleNamespace(
+            create=lambda **kw: (_AsyncRaw if client._async else _SyncRaw)(client, kw))
+
+    def create(self, **kw):
+        if not kw.get("stream"):
+            return self._c._simple("chat", kw)
+        return self._astream(kw) if self._c._async else self._sstream(kw)
+
+    def _sstream(self, kw):
+        tape  = self._c._tape
+        entry = tape.find("chat.stream", kw)
+        if entry:
+            return _sreplay_stream(tape, entry)
+        t0 = time.perf_counter()
+        return _srecord_stream(tape, kw, self._c.real.chat.completions.create(**kw), t0)
+
+    async def _astream(self, kw):
+        tape  = self._c._tape
+        entry = tape.find("chat.stream", kw)
+        if entry:
+            return _replay_stream(tape, entry)
+        t0     = time.perf_counter()
+        stream = await self._c.real.chat.completions.create(**kw)
+        return _record_stream(tape, kw, stream, t0)
+
+
+async def _replay_stream(tape: Cassette, entry: dict):
+    ttfb, total = tape.delays(entry)
+    chunks = entry.get("chunks") or []
+    await asyncio.sleep(ttfb)
+    step = (total - ttfb) / max(len(chunks) - 1, 1)
+    for i, chunk in enumerate(chunks):
+        if i:
+            await asyncio.sleep(step)
+        yield _ns(chunk)
+
+
+async def _record_stream(tape: Cassette, kw: dict, stream, t0: float):
+    chunks, first = [], None
+    async for chunk in stream:
+        if first is None:
+            first = time.perf_counter()
+        chunks.append(_dump(chunk))
+        yield chunk
+    end = time.perf_counter()
+    tape.record("chat.stream", kw, None, ttfb=(first or end) - t0, total=end - t0,
+                chunks=chunks)
+
+
+def _sreplay_stream(tape: Cassette, entry: dict):
+    ttfb, total = tape.delays(entry)
+    chunks = entry.get("chunks") or []
+    time.sleep(ttfb)
+    step = (total - ttfb) / max(len(chunks) - 1, 1)
+    for i, chunk in enumerate(chunks):
+        if i:
+            time.sleep(step)
+        yield _ns(chunk)
+
+
+def _srecord_stream(tape: Cassette, kw: dict, stream, t0: float):
+    chunks, first = [], None
+    for chunk in stream:
+        if first is None:
+            first = time.perf_counter()
+        chunks.append(_dump(chunk))
+        yield chunk
+    end = time.perf_counter()
+    tape.record("chat.stream", kw, None, ttfb=(first or end) - t0, total=end - t0,
+                chunks=chunks)
+
+
+class _AsyncRaw:
+    """``with_streaming_response.create`` – headers first, body on ``parse()``."""
+    def __init__(self, client: CassetteClient, kw: dict):
+        self._c, self._kw = client, kw
+        self._cm = self._raw = self._entry = None
+
+    async def __aenter__(self):
+        self._t0    = time.perf_counter()
+        self._entry = self._c._tape.find("chat", self._kw)
+        if self._entry:
+            self._ttfb, self._total = self._c._tape.delays(self._entry)
+            await asyncio.sleep(self._ttfb)
+        else:
+            self._cm   = self._c.real.chat.completions.with_streaming_response.create(**self._kw)
+            self._raw  = await self._cm.__aenter__()
+            self._ttfb = time.perf_counter() - self._t0
+        return self
+
+    async def parse(self):
+        if self._entry:
+            await asyncio.sleep(max(self._total - self._ttfb, 0.0))
+            return _ns(self._entry["response"])
+        rsp = await self._raw.parse()
+        self._c._tape.record("chat", self._kw, _dump(rsp), ttfb=self._ttfb,
+                             total=time.perf_counter() - self._t0)
+        return rsp
+
+    async def __aexit__(self, *exc):
+        if self._cm is not None:
+            return await self._cm.__aexit__(*exc)
+
+
+class _SyncRaw:
+    def __init__(self, client: CassetteClient, kw: dict):
+        self._c, self._kw = client, kw
+        self._cm = self._raw = self._entry = None
+
+    def __enter__(self):
+        self._t0    = time.perf_counter()
+        self._entry = self._c._tape.find("chat", self._kw)
+        if self._entry:
+            self._ttfb, self._total = self._c._tape.delays(self._entry)
+            time.sleep(self._ttfb)
+        else:
+            self._cm   = self._c.real.chat.completions.with_streaming_response.create(**self._kw)
+            self._raw  = self._cm.__enter__()
+            self._ttfb = time.perf_counter() - self._t0
+        return self
+
+    def parse(self):
+        if self._entry:
+            time.sleep(max(self._total - self._ttfb, 0.0))
+            return _ns(self._entry["response"])
+        rsp = self._raw.parse()
+        self._c._tape.record("chat", self._kw, _dump(rsp), ttfb=self._ttfb,
+                             total=time.perf_counter() - self._t0)
+        return rsp
+
+    def __exit__(self, *exc):
+        if self._cm is not None:
+            return self._cm.__exit__(*exc)
+
+
+cassette = Cassette(
+    path=os.getenv("NEO_LLM_CASSETTE", os.path.join(".cache", "llm_cassette.jsonl")),
+    mode=os.getenv("NEO_LLM_CASSETTE_MODE", "off").lower(),
+    latency=os.getenv("NEO_LLM_CASSETTE_LATENCY", "recorded"),
+    seed=int(os.getenv("NEO_LLM_CASSETTE_SEED", "0")),
+)
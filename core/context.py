@@ -0,0 +1,48 @@
+"""
+Per-call context shared by NeuroFactory, Executor and BaseBrain.
+
+Whoever knows something about the current call (the factory knows the
+neuro and its conf.json knobs, the executor knows cid / node) puts it in
+a ``scope``; BaseBrain and friends read it with ``get``.  Because it is a
+ContextVar, every asyncio task sees its own copy – concurrent turns never
+leak into each other.
+
+``deadline`` is special: Brain sets it once per turn (event-loop time) and
+every task spawned for the turn inherits it, so executor nodes and LLM
+calls can all ask how much time is ``remaining()``.
+"""
+import asyncio
+import contextlib
+from contextvars import ContextVar
+
+_ctx: ContextVar[dict] = ContextVar("neuro_ctx", default={})
+
+
+def get(key: str, default=None):
+    return _ctx.get().get(key, default)
+
+
+def remaining() -> float | None:
+    """Seconds left until the turn's deadline (never negative), or None."""
+    deadline = get("deadline")
+    if deadline is None:
+        return None
+    try:
+        now = asyncio.get_running_loop().time()
+    except RuntimeError:                 # sync caller outside the loop
+        return None
+    return max(0.0, deadline - now)
+
+
+def current() -> dict:
+    return dict(_ctx.get())
+
+
+@contextlib.contextmanager
+def scope(**kw):
+    """Layer *kw* on top of the current context for the duration of the block."""
+    token = _ctx.set({**_ctx.get(), **kw})
+    try:
+        yield
+    finally:
+        _ctx.reset(token)
@@ -15,7 +15,9 @@ class Conversation:
     def __init__(self, conv_id: str | None = None):
         self.id   = conv_id or uuid.uuid4().hex
         self._fp  = os.path.join(_CONV_DIR, f"{self.id}.json")
+        self._sfp = os.path.join(_CONV_DIR, f"{self.id}.summary.json")
         self._log = self._load()
+        self._summary = None
 
     # ---------- public helpers -------------------------------------------
     def add(self, sender: str, text: str) -> None:
@@ -30,6 +32,21 @@ class Conversation:
         """Return complete history or last *n* messages."""
         return self._log if n is None else self._log[-n:]
 
+    def summary(self) -> dict:
+        """Rolling summary of older turns: {text, upto} (upto = turns folded in)."""
+        if self._summary is None:
+            if os.path.exists(self._sfp):
+                with open(self._sfp, "r", encoding="utf-8") as f:
+                    self._summary = json.load(f)
+            else:
+                self._summary = {"text": "", "upto": 0}
+        return self._summary
+
+    def set_summary(self, text: str, upto: int) -> None:
+        self._summary = {"text": text, "upto": upto}
+        with open(self._sfp, "w", encoding="utf-8") as f:
+            json.dump(self._summary, f, ensure_ascii=False, indent=2)
+
     # ---------- internal io ----------------------------------------------
     def _load(self) -> list:
         if os.path.exists(self._fp):
@@ -0,0 +1,67 @@
+"""
+Compact event payloads.
+
+Node outputs and state can hold whole files, file lists or video metadata;
+publishing them verbatim makes every event – and its JSON encoding for
+each socket – grow with the state.  Before anything goes on the hub:
+
+  * internal ``__*`` keys are dropped
+  * strings longer than ``NEO_EVENT_MAX_CHARS`` (default 2000) are cut,
+    with the number of missing characters appended
+  * other values that would not fit become a size-annotated handle,
+    ``{"type": "list", "len": 812, "bytes": ">2000", "ref": "/tasks/<cid>/state/files"}``;
+    ``ref`` serves the full value (see server.py)
+  * values JSON can't encode become ``"<TypeName>"``
+
+Sizes are measured with a budgeted walk that stops as soon as the limit
+is passed, so a large value costs no more than a small one.
+"""
+import os
+
+MAX_CHARS = int(os.getenv("NEO_EVENT_MAX_CHARS", "2000"))
+
+
+def _fits(value, budget: int) -> int:
+    """Budget left after JSON-encoding *value* (roughly); < 0 → too big or not JSON."""
+    if isinstance(value, str):
+        return budget - len(value) - 2
+    if value is None or isinstance(value, (bool, int, float)):
+        return budget - 8
+    if isinstance(value, dict):
+        budget -= 2
+        for k, v in value.items():
+            if not isinstance(k, str):
+                return -1
+            budget = _fits(v, budget - len(k) - 4)
+            if budget < 0:
+                return budget
+        return budget
+    if isinstance(value, (list, tuple)):
+        budget -= 2
+        for v in value:
+            budget = _fits(v, budget - 1)
+            if budget < 0:
+                return budget
+        return budget
+    return -1
+
+
+def compact(value, ref: str | None = None, limit: int = MAX_CHARS):
+    if isinstance(value, str):
+        if len(value) <= limit:
+            return value
+        return value[:limit] + f"… [+{len(value) - limit} chars]"
+    if _fits(value, limit) >= 0:
+        return value
+    if not isinstance(value, (dict, list, tuple)):
+        return f"<{type(value).__name__}>"
+    handle = {"type": type(value).__name__, "len": len(value), "bytes": f">{limit}"}
+    if ref:
+        handle["ref"] = ref
+    return handle
+
+
+def payload(values: dict, cid: str | None = None, limit: int = MAX_CHARS) -> dict:
+    """Public, size-bounded view of a dict of outputs / state."""
+    return {k: compact(v, f"/tasks/{cid}/state/{k}" if cid else None, limit)
+            for k, v in values.items() if not str(k).startswith("__")}
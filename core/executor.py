@@ -1,10 +1,219 @@
+import asyncio
+import hashlib
+import json
+import os
+import weakref
+
+from core import context, events
+from core.flow_compiler import CompiledPlan, FlowError, compile_flow
+from core.neuro_factory import NeuroTimeout
+from core.run_store import runs
+
+# per-call keys NeuroFactory puts into a node's state – never merged back
+_PER_CALL = {"__llm", "__prompt", "__history", "__logs"}
+
+# cap on nodes running at once across *all* flows (per flow: "max_parallel")
+_GLOBAL_PARALLEL = int(os.getenv("NEO_DAG_GLOBAL_PARALLEL", "16"))
+_FLOW_PARALLEL   = int(os.getenv("NEO_DAG_MAX_PARALLEL", "4"))
+
+# one semaphore per event loop – a semaphore binds to the first loop that
+# waits on it, and tests / a reloaded server run more than one
+_global_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem  = _global_slots.get(loop)
+    if sem is None:
+        sem = _global_slots[loop] = asyncio.Semaphore(_GLOBAL_PARALLEL)
+    return sem
+
+
 class Executor:
-    """Walk the DAG produced by planner and execute each node sequentially."""
-    def __init__(self, flow, factory, state, pub):
-        self.flow     = flow
+    """
+    Run the DAG produced by the planner.
+
+    Flows are compiled (core.flow_compiler) before anything runs – names
+    resolved, params checked, cycles rejected – and an invalid flow is sent
+    back to the planner instead of being half-executed.
+
+    Edges come from ``next`` (id or list of ids) and ``deps`` (ids that must
+    finish first), so the old linked-list flows still work unchanged.  A node
+    starts as soon as all its predecessors are done; independent nodes run
+    concurrently, capped per flow and globally.
+
+    Every node works on its own shallow copy of the shared state.  Outputs
+    (and anything it wrote into its copy) are merged back on completion by
+    *writer rank* – the node's position in a topological order – so when two
+    concurrent nodes write the same key the result is the one a sequential
+    run in that order would give, whatever order they actually finish in.
+
+    Every successful node is checkpointed under a signature of its neuro,
+    params and upstream signatures.  After a replan, nodes of the new flow
+    whose signature matches are restored instead of re-run, so execution
+    resumes at the first new node; ``node.done`` carries ``"status":
+    "executed"`` or ``"restored"`` and only the keys the node added or
+    changed, compacted by core.events.
+
+    The whole run is bounded by the turn's ``deadline`` (see core.context).
+    Nodes that time out, or are still running when the deadline passes or
+    the turn is superseded, are cancelled with a ``node.cancelled`` event.
+
+    With a ``run_id`` the flow, state, checkpoints and running nodes are
+    saved to core.run_store at every node boundary, so Brain can resume the
+    task after a restart.
+    """
+    def __init__(self, flow, factory, state, pub, run_id=None):
+        # a CompiledPlan from Brain, or a raw flow dict (resume) compiled on first run
+        self.plan     = flow if isinstance(flow, CompiledPlan) else None
+        self.flow     = self.plan.flow() if self.plan else flow
         self.factory  = factory
         self.state    = state
         self.pub      = pub            # async callback
+        self.replanned = False         # True once the first flow needed a re-plan
+        self._owner   = {}             # state key → rank of the node that wrote it
+        self.checkpoints = {}          # node signature → (out, writes)
+        self.run_id   = run_id         # None → progress is not persisted
+        self._running = set()          # node ids started but not finished
+        self.counts   = {"executed": 0, "restored": 0, "failed": 0}
+
+    # ------------------------------------------------------------------ graph
+    def _signatures(self, order, preds) -> dict:
+        """node → hash of (neuro, params, upstream signatures)."""
+        nodes, sig = self.flow["nodes"], {}
+        for n in order:
+            blob = json.dumps([nodes[n]["neuro"], nodes[n].get("params", {}),
+                               sorted(sig[p] for p in preds[n])],
+                              sort_keys=True, default=str)
+            sig[n] = hashlib.sha1(blob.encode("utf-8")).hexdigest()
+        return sig
+
+    def _persist(self):
+        runs.save(self.run_id, cid=self.state.get("__cid"), profile=self.state.get("__profile"),
+                  flow=self.flow, state=self.state, checkpoints=self.checkpoints,
+                  running=self._running)
+
+    def _changed(self, values: dict) -> dict:
+        """The part of *values* that is new to the shared state (before merging)."""
+        return {k: v for k, v in values.items()
+                if k not in self.state or self.state[k] is not v}
+
+    def _merge(self, rank: int, values: dict):
+        for k, v in values.items():
+            if rank >= self._owner.get(k, -1):
+                self.state[k] = v
+                self._owner[k] = rank
+
+    # ------------------------------------------------------------------ nodes
+    async def _call(self, node: str, limit: asyncio.Semaphore):
+        """Run one node on a private view of the state → (out, writes, error)."""
+        spec = self.flow["nodes"][node]
+        async with limit, _slots():
+            await self.pub("node.start", {"id": node, "neuro": spec["neuro"]})
+            self._running.add(node)
+            self._persist()
+            print(f"[EXECUTOR] Running neuro: {spec['neuro']} for node: {node}")
+            view = dict(self.state)
+            try:
+                # cid / node / pub let BaseBrain stream assistant.delta events
+                with context.scope(cid=self.state.get("__cid"), node=node, pub=self.pub):
+                    out = await self.factory.run(
+                        spec["neuro"], view, **spec.get("params", {})
+                    )
+            except Exception as e:
+                return None, {}, e
+        writes = {k: v for k, v in view.items()
+                  if k not in _PER_CALL and (k not in self.state or self.state[k] is not v)}
+        return (out if isinstance(out, dict) else {}), writes, None
+
+    async def _restore(self, node: str, rank: int, sig: str):
+        """Replay a checkpointed node: merge its state, skip the side effects."""
+        out, writes = self.checkpoints[sig]
+        changed = self._changed({**writes, **out})
+        self._merge(rank, {**writes, **out})
+        self.counts["restored"] += 1
+        print(f"[EXECUTOR] Restored node {node} from checkpoint")
+        await self.pub("node.done", {"id": node, "neuro": self.flow["nodes"][node]["neuro"],
+                                     "out": events.payload(changed, self.state.get("__cid")),
+                                     "status": "restored"})
+        self._persist()
+
+    async def _finish(self, node: str, rank: int, sig: str, out, writes, error) -> bool:
+        """Publish / merge one finished node.  False → the flow failed."""
+        spec = self.flow["nodes"][node]
+        conv = self.state.get("__conv")
+        self._running.discard(node)
+        if isinstance(error, NeuroTimeout):
+            # conf.json "timeout" hit – cancelled inside the factory.  Terminal:
+            # a replan would most likely pick the same slow neuro again.
+            self.counts["failed"] += 1
+            await self.pub("assistant", f"⏱ {spec['neuro']} timed out.")
+            await self.pub("node.cancelled", {"id": node, "neuro": spec["neuro"],
+                                              "reason": "timeout"})
+            return False
+        if error is not None:
+            self.counts["failed"] += 1
+            err = {
+                "error": type(error).__name__,
+                "message": str(error),
+                "neuro": spec["neuro"],
+            }
+            # one unified place to surface the error
+            await self.pub("assistant", f"⚠️ {spec['neuro']} failed: {error}")
+            await self.pub("node.done", {"id": node, "neuro": spec["neuro"],
+                                         "out": err, "status": "failed"})
+            # flag for replanner; no new nodes are started after this
+            self.state["__needs_replan"] = True
+            return False
+
+        # ── forward captured stdout to listeners ───────────────────
+        logs = out.pop("__logs", None)
+        if logs:
+            await self.pub("node.log", {
+                "id":   node,
+                "neuro": spec["neuro"],
+                "logs": events.compact(logs)
+            })
+
+        # merge outputs (and direct state writes) into shared state
+        changed = self._changed({**writes, **out})
+        self._merge(rank, {**writes, **out})
+        self.counts["executed"] += 1
+
+        # any neuro can explicitly ask for another planning round
+        if out.get("replan") or out.get("needs_replan"):
+            self.state["__needs_replan"] = True
+        else:
+            self.checkpoints[sig] = (dict(out), writes)
+        print(f"[EXECUTOR] Output for node {node}: {out}")
+
+        # ── persist *and publish* assistant replies ──────────
+        if "reply" in out and isinstance(out["reply"], str):
+            if conv:                       # save to conversation log
+                conv.add("assistant", out["reply"])
+            # broadcast so every websocket client receives it
+            await self.pub("assistant", out["reply"])
+            print(f"[EXECUTOR] Emitted assistant reply: {out['reply'][:60]}…")
+
+        print(f"[EXECUTOR] Publishing node.done event for node: {node}")
+        await self.pub("node.done", {"id": node, "neuro": spec["neuro"],
+                                     "out": events.payload(changed, self.state.get("__cid")),
+                                     "status": "executed"})
+        print(f"[EXECUTOR] Published node.done event successfully")
+        self._persist()
+        return True
+
+    async def _cancel(self, running: dict):
+        """Cancel still-running nodes and wait until they have let go."""
+        reason = "deadline" if context.remaining() == 0 else "superseded"
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        for node in running.values():
+            print(f"[EXECUTOR] Cancelled node {node} ({reason})")
+            await self.pub("node.cancelled", {"id": node, "neuro": self.flow["nodes"][node]["neuro"],
+                                              "reason": reason})
 
     # ------------------------------------------------------------------ helpers
     async def _run_once(self):
@@ -13,75 +222,95 @@ class Executor:
         Returns True when a re-plan is requested (error flag or explicit
         \"replan\" key from a neuro).
         """
-        conv  = self.state.get("__conv")
-        node  = self.flow["start"]
-        nodes = self.flow["nodes"]
-
         # clear previous replanning flags
         self.state.pop("__needs_replan", None)
+        self._owner = {}
 
-        while node:
-            spec = nodes[node]                        # {neuro, params, next}
-            await self.pub("node.start",
-                           {"id": node, "neuro": spec["neuro"]})
-
-            print(f"[EXECUTOR] Running neuro: {spec['neuro']} for node: {node}")
+        if self.plan is None:
             try:
-                out = await self.factory.run(
-                    spec["neuro"], self.state, **spec.get("params", {})
-                )
-            except Exception as e:
-                err = {
-                    "error": type(e).__name__,
-                    "message": str(e),
-                    "neuro": spec["neuro"],
-                }
-                # one unified place to surface the error
-                await self.pub("assistant", f"⚠️ {spec['neuro']} failed: {e}")
-                await self.pub("node.done", {"id": node, "out": err})
-                # flag for replanner and stop executing this flow
+                self.plan = compile_flow(self.flow, self.factory)
+            except FlowError as e:
+                print(f"[EXECUTOR] Invalid flow: {e}")
+                await self.pub("assistant", f"⚠️ The plan is invalid ({e}) – re-planning.")
                 self.state["__needs_replan"] = True
-                break
-
-            # ── forward captured stdout to listeners ───────────────────
-            logs = out.pop("__logs", None)
-            if logs:
-                await self.pub("node.log", {
-                    "id":   node,
-                    "neuro": spec["neuro"],
-                    "logs": logs
-                })
+                return True
+            self.flow = self.plan.flow()
+        order, preds, succ = self.plan.order, self.plan.preds, self.plan.succ
 
-            # merge outputs into shared state
-            self.state.update(out)
+        rank    = {n: i for i, n in enumerate(order)}
+        sig     = self._signatures(order, preds)
+        waiting = {n: set(preds[n]) for n in order}
+        running = {}
+        limit   = asyncio.Semaphore(self.plan.max_parallel or _FLOW_PARALLEL)
+        failed  = False
 
-            # any neuro can explicitly ask for another planning round
-            if out.get("replan") or out.get("needs_replan"):
-                self.state["__needs_replan"] = True
-            print(f"[EXECUTOR] Output for node {node}: {out}")
-
-            # ── NEW: persist *and publish* assistant replies ──────────
-            if "reply" in out and isinstance(out["reply"], str):
-                if conv:                       # save to conversation log
-                    conv.add("assistant", out["reply"])
-                # broadcast so every websocket client receives it
-                await self.pub("assistant", out["reply"])
-                print(f"[EXECUTOR] Emitted assistant reply: {out['reply'][:60]}…")
+        def release(n):
+            for m in succ[n]:
+                if m in waiting:
+                    waiting[m].discard(n)
 
-            print(f"[EXECUTOR] Publishing node.done event for node: {node}")
-            await self.pub("node.done", {"id": node, "out": out})
-            print(f"[EXECUTOR] Published node.done event successfully")
-            node = spec.get("next")
+        try:
+            while True:
+                ready = [n for n in order if n in waiting and not waiting[n]]
+                while ready and not failed:
+                    n = ready.pop(0)
+                    del waiting[n]
+                    if sig[n] in self.checkpoints:
+                        # completed in an earlier round – no need to run it again
+                        await self._restore(n, rank[n], sig[n])
+                        release(n)
+                        ready = [n for n in order if n in waiting and not waiting[n]]
+                    else:
+                        running[asyncio.ensure_future(self._call(n, limit))] = n
+                if not running:
+                    break
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                # several can finish in one tick – handle them in rank order
+                for task in sorted(finished, key=lambda t: rank[running[t]]):
+                    n = running.pop(task)
+                    if not await self._finish(n, rank[n], sig[n], *task.result()):
+                        failed = True
+                    release(n)
+        except asyncio.CancelledError:
+            # deadline passed or a newer turn replaced us – free the capacity
+            await self._cancel(running)
+            raise
 
         # Emit task.done only when no replan is pending
         needs_replan = bool(self.state.get("__needs_replan"))
         if not needs_replan:
             print("[EXECUTOR] All nodes processed, publishing task.done event")
-            await self.pub("task.done", {"state": self.state})
+            await self.pub("task.done", self._summary())
         return needs_replan
 
+    def _summary(self) -> dict:
+        """task.done payload – a summary, never the state itself."""
+        keys = sorted(k for k in self.state if not k.startswith("__"))
+        return {
+            "goal":      events.compact(self.state.get("goal", ""), limit=200),
+            "nodes":     dict(self.counts),
+            "replanned": self.replanned,
+            "keys":      keys,
+        }
+
     # ------------------------------------------------------------------ public
     async def run(self):
+        """Run the flow (with re-plans) within the turn's deadline."""
+        try:
+            async with asyncio.timeout_at(context.get("deadline")) as tm:
+                await self._run()
+        except TimeoutError:
+            if not tm.expired():
+                raise
+            print("[EXECUTOR] Turn deadline passed, flow cancelled")
+            await self.pub("assistant", "⏱ This took too long and was cancelled.")
+        finally:
+            # a cancelled run keeps its record: either Brain already dropped
+            # it (superseded) or the server is going down and resumes it later
+            if not asyncio.current_task().cancelling():
+                runs.drop(self.run_id)
+
+    async def _run(self):
         """
         Execute → (optionally) re-plan → execute … until no re-plan is needed
         or the safety cap (3 rounds) is hit.
@@ -93,6 +322,7 @@ class Executor:
             need_replan = await self._run_once()
             if not need_replan:
                 break
+            self.replanned = True
 
             if rounds >= max_rounds:
                 await self.pub("assistant",
@@ -105,12 +335,13 @@ class Executor:
             cid     = self.state.get("__cid")
 
             # build a fresh plan with the updated state
-            reply = await self.factory.run(
-                planner,
-                self.state,
-                goal=goal,
-                catalogue=self.factory.catalogue(cid)
-            )
+            with context.scope(cid=cid, pub=self.pub):
+                reply = await self.factory.run(
+                    planner,
+                    self.state,
+                    goal=goal,
+                    catalogue=self.factory.catalogue(cid)
+                )
 
             plan = reply.get("plan", reply)  # compat with older planners
             if not plan.get("ok"):
@@ -147,3 +378,5 @@ class Executor:
                     flow = _wrap(flow["name"], flow.get("params", {}))
 
             self.flow = flow   # ⚡ always a proper DAG now
+            self.plan = None   # compiled at the start of the next round
+            self._persist()
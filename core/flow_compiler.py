@@ -0,0 +1,247 @@
+"""
+Static flow compilation – planner output is checked before any node runs.
+
+``compile_flow(flow, factory)`` turns the planner's DAG dict into an
+immutable ``CompiledPlan`` or raises ``FlowError``:
+
+  * neuro names are resolved against the factory: exact name, then the
+    module-level ``alias`` maps neuros export (e.g. code_planner's
+    ``write_file → code_file_write``), then a case / ``-`` insensitive match
+  * params are checked against the introspected ``run()`` signature:
+    missing required arguments are errors; unknown ones are dropped when
+    ``run`` takes no ``**kw``; strings given for an ``int`` / ``float`` /
+    ``bool`` input declared in conf.json are converted
+  * edges to unknown nodes and nodes unreachable from ``start`` are dropped
+  * cycles are errors
+
+Everything that was fixed up is listed in ``plan.repairs``.  The executor
+works from ``plan.order`` / ``preds`` / ``succ``; ``plan.flow()`` is the
+repaired flow as a plain dict for the run store and plan cache.
+"""
+import inspect
+from dataclasses import dataclass
+from types import MappingProxyType
+
+_TYPES = {"int": int, "integer": int, "float": float, "number": float, "bool": bool,
+          "boolean": bool}
+
+counters = {"compiled": 0, "repaired": 0, "rejected": 0}
+
+
+class FlowError(ValueError):
+    """The flow can't run; ``problems`` says why (one line each)."""
+    def __init__(self, problems: list[str]):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+def _ids(ref) -> list:
+    """``next`` / ``deps`` / ``start`` may be an id, a list of ids or null."""
+    if ref is None:
+        return []
+    return [ref] if isinstance(ref, str) else [r for r in ref if r]
+
+
+@dataclass(frozen=True)
+class Node:
+    id:     str
+    neuro:  str
+    params: MappingProxyType
+    next:   tuple
+    deps:   tuple
+
+
+@dataclass(frozen=True)
+class CompiledPlan:
+    start:        tuple
+    nodes:        MappingProxyType      # id → Node, reachable nodes only
+    order:        tuple                 # topological, ties in discovery order
+    preds:        MappingProxyType      # id → frozenset of ids
+    succ:         MappingProxyType      # id → tuple of ids
+    max_parallel: int | None
+    repairs:      tuple
+
+    def flow(self) -> dict:
+        """The repaired flow as a plain (JSON-able) dict."""
+        out = {
+            "start": self.start[0] if len(self.start) == 1 else list(self.start),
+            "nodes": {n.id: {"neuro": n.neuro, "params": dict(n.params),
+                             "next": (n.next[0] if len(n.next) == 1 else list(n.next)) or None,
+                             **({"deps": list(n.deps)} if n.deps else {})}
+                      for n in self.nodes.values()},
+        }
+        if self.max_parallel:
+            out["max_parallel"] = self.max_parallel
+        return out
+
+
+# ---------- neuro names -------------------------------------------------------
+def _key(name: str) -> str:
+    return name.strip().lower().replace("-", "_").replace(" ", "_")
+
+
+def _resolve(name, factory) -> str | None:
+    if not isinstance(name, str):
+        return None
+    if name in factory.reg:
+        return name
+    alias = factory.aliases.get(name)
+    if alias in factory.reg:
+        return alias
+    wanted = _key(name)
+    for real in factory.reg:
+        if _key(real) == wanted:
+            return real
+    return None
+
+
+# ---------- params ------------------------------------------------------------
+def _coerce(value, kind):
+    if kind is bool:
+        low = value.strip().lower()
+        if low in ("true", "yes", "1"):
+            return True
+        if low in ("false", "no", "0"):
+            return False
+        raise ValueError(value)
+    return kind(value.strip())
+
+
+def _check_params(nid, neuro, params, factory, problems, repairs) -> dict:
+    if not isinstance(params, dict):
+        problems.append(f"{nid}: params must be an object, got {type(params).__name__}")
+        return {}
+    params = dict(params)
+    sig = factory.signatures.get(neuro)
+    if sig is not None:
+        args = list(sig.parameters.values())[1:]           # first one is state
+        named = {p.name for p in args if p.kind not in (p.VAR_POSITIONAL, p.VAR_KEYWORD)}
+        if not any(p.kind is p.VAR_KEYWORD for p in args):
+            for k in [k for k in params if k not in named]:
+                del params[k]
+                repairs.append(f"{nid}: dropped unknown param {k!r} for {neuro}")
+        missing = [p.name for p in args
+                   if p.default is inspect.Parameter.empty and p.name not in params
+                   and p.kind not in (p.VAR_POSITIONAL, p.VAR_KEYWORD)]
+        if missing:
+            problems.append(f"{nid}: {neuro} needs {', '.join(missing)}")
+
+    inputs = factory.reg[neuro].inputs
+    if isinstance(inputs, dict):
+        for k, t in inputs.items():
+            kind = _TYPES.get(str(t).lower())
+            if kind is None or not isinstance(params.get(k), str):
+                continue
+            try:
+                params[k] = _coerce(params[k], kind)
+                repairs.append(f"{nid}: {k} converted to {t}")
+            except ValueError:
+                problems.append(f"{nid}: {neuro}.{k} should be {t}, got {params[k]!r}")
+    return params
+
+
+# ---------- compile -----------------------------------------------------------
+def compile_flow(flow, factory) -> CompiledPlan:
+    """Validate / repair *flow* for *factory*; raises FlowError when it can't run."""
+    try:
+        plan = _compile(flow, factory)
+    except FlowError:
+        counters["rejected"] += 1
+        raise
+    counters["compiled"] += 1
+    if plan.repairs:
+        counters["repaired"] += 1
+        for r in plan.repairs:
+            print(f"[compiler] {r}")
+    return plan
+
+
+def _compile(flow, factory) -> CompiledPlan:
+    if not isinstance(flow, dict) or not isinstance(flow.get("nodes"), dict) or not flow["nodes"]:
+        raise FlowError(["flow has no nodes"])
+    raw, problems, repairs = flow["nodes"], [], []
+
+    start = [s for s in _ids(flow.get("start")) if s in raw]
+    if not start:
+        raise FlowError([f"start {flow.get('start')!r} is not a node"])
+
+    # edges – unknown targets are dropped, as the executor always did
+    succ = {n: [] for n in raw}
+    nxt, deps = {n: [] for n in raw}, {n: [] for n in raw}
+    for n, spec in raw.items():
+        if not isinstance(spec, dict):
+            raise FlowError([f"{n}: node must be an object"])
+        for m in _ids(spec.get("next")):
+            if m in raw:
+                succ[n].append(m)
+                nxt[n].append(m)
+            else:
+                repairs.append(f"{n}.next → unknown node {m!r}, dropped")
+        for d in _ids(spec.get("deps")):
+            if d in raw:
+                succ[d].append(n)
+                deps[n].append(d)
+            else:
+                repairs.append(f"{n}.deps → unknown node {d!r}, dropped")
+
+    seen, stack = [], list(start)
+    while stack:
+        n = stack.pop(0)
+        if n not in seen:
+            seen.append(n)
+            stack.extend(succ[n])
+    for n in raw:
+        if n not in seen:
+            repairs.append(f"{n} is unreachable from start, dropped")
+    preds = {n: set() for n in seen}
+    for n in seen:
+        for m in succ[n]:
+            preds[m].add(n)
+
+    # Kahn, ties broken by discovery order → deterministic ranks
+    order, indeg = [], {n: len(preds[n]) for n in seen}
+    ready = [n for n in seen if not indeg[n]]
+    while ready:
+        n = ready.pop(0)
+        order.append(n)
+        for m in succ[n]:
+            indeg[m] -= 1
+            if not indeg[m]:
+                ready.append(m)
+        ready.sort(key=seen.index)
+    if len(order) < len(seen):
+        problems.append("cycle through " + ", ".join(n for n in seen if n not in order))
+
+    nodes = {}
+    for n in seen:
+        spec  = raw[n]
+        neuro = _resolve(spec.get("neuro"), factory)
+        if neuro is None:
+            problems.append(f"{n}: unknown neuro {spec.get('neuro')!r}")
+            continue
+        if neuro != spec.get("neuro"):
+            repairs.append(f"{n}: neuro {spec.get('neuro')!r} → {neuro!r}")
+        params = _check_params(n, neuro, spec.get("params") or {}, factory, problems, repairs)
+        nodes[n] = Node(n, neuro, MappingProxyType(params), tuple(nxt[n]),
+                        tuple(d for d in deps[n] if d in preds))
+    if problems:
+        raise FlowError(problems)
+
+    try:
+        limit = int(flow.get("max_parallel") or 0) or None
+    except (TypeError, ValueError):
+        limit = None
+        repairs.append(f"max_parallel {flow.get('max_parallel')!r} ignored")
+    return CompiledPlan(
+        start=tuple(start),
+        nodes=MappingProxyType(nodes),
+        order=tuple(order),
+        preds=MappingProxyType({n: frozenset(preds[n]) for n in seen}),
+        succ=MappingProxyType({n: tuple(succ[n]) for n in seen}),
+        max_parallel=limit,
+        repairs=tuple(repairs),
+    )
+
+
+def stats() -> dict:
+    return dict(counters)
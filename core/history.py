@@ -0,0 +1,194 @@
+"""
+Token-budgeted conversation context.
+
+Instead of pasting the whole transcript into every prompt, ``render``
+returns
+
+    Summary of earlier conversation:
+    <rolling summary>
+
+    <last K turns verbatim>
+
+trimmed to a token budget.  The summary is stored next to the
+conversation (``conversations/<cid>.summary.json``) and refreshed
+incrementally in the background: only the turns that have fallen out of
+the verbatim window since the last refresh are folded in, so a long
+session costs one small summarisation call now and then instead of an
+ever-growing prompt on every turn.
+
+Budgets come from the profile (``"history": {"budget": 2000, "turns": 10}``)
+and can be overridden per neuro in its conf.json.
+"""
+import asyncio
+
+from core import context
+
+try:
+    import tiktoken
+except ImportError:          # optional – fall back to a character estimate
+    tiktoken = None
+
+DEFAULT_BUDGET = 2000
+DEFAULT_TURNS  = 10
+
+_SUMMARY_PROMPT = (
+    "You maintain a running summary of a chat between a user and the assistant Neo. "
+    "Merge the new turns into the existing summary. Keep names, decisions, open "
+    "questions, active project / neuro names and file paths. Drop greetings and "
+    "small talk. Reply with the updated summary only, at most {words} words."
+)
+
+_encodings = {}
+_resolving = set()
+
+
+def _resolve(model: str):
+    try:
+        enc = tiktoken.encoding_for_model(model)
+    except Exception:
+        try:
+            enc = tiktoken.get_encoding("o200k_base")
+        except Exception:       # no cached BPE and no network
+            enc = None
+    _encodings[model] = enc
+    _resolving.discard(model)
+    return enc
+
+
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    if model in _encodings:
+        return _encodings[model]
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return _resolve(model)
+    # the first lookup may download the BPE file – never on the event loop;
+    # estimate by characters until the worker has it
+    if model not in _resolving:
+        _resolving.add(model)
+        loop.run_in_executor(None, _resolve, model)
+    return None
+
+
+def warm(*models: str):
+    """Load the encodings up front (blocking – call via ``asyncio.to_thread``)."""
+    if tiktoken is not None:
+        for model in models or ("gpt-4o",):
+            if model not in _encodings:
+                _resolve(model)
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    enc = _encoding(model)
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    # ~4 characters per token for English prose and code
+    return (len(text) + 3) // 4
+
+
+def truncate_tokens(text: str, budget: int, model: str = "gpt-4o", *, keep: str = "tail") -> str:
+    """Cut *text* down to *budget* tokens, keeping the head or the tail."""
+    if budget <= 0:
+        return ""
+    enc = _encoding(model)
+    if enc is not None:
+        toks = enc.encode(text, disallowed_special=())
+        if len(toks) <= budget:
+            return text
+        toks = toks[-budget:] if keep == "tail" else toks[:budget]
+        return "…" + enc.decode(toks) if keep == "tail" else enc.decode(toks) + "…"
+    limit = budget * 4
+    if len(text) <= limit:
+        return text
+    return "…" + text[-limit:] if keep == "tail" else text[:limit] + "…"
+
+
+def _line(msg: dict) -> str:
+    return f"{msg['sender']}: {msg['text']}"
+
+
+class HistoryManager:
+    def __init__(self, summary_model: str = "gpt-4o-mini"):
+        self.summary_model = summary_model
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    # ---------- public ----------------------------------------------------
+    def render(self, conv, *, budget: int = DEFAULT_BUDGET, turns: int = DEFAULT_TURNS,
+               model: str = "gpt-4o") -> str:
+        log = conv.history()
+        if not log:
+            return ""
+
+        # newest → oldest until we run out of turns or tokens
+        recent, used = [], 0
+        for msg in reversed(log[-turns:] if turns else log):
+            line = _line(msg)
+            cost = count_tokens(line, model) + 1
+            if recent and used + cost > budget:
+                break
+            if not recent and cost > budget:          # a single huge turn
+                line, cost = truncate_tokens(line, budget, model, keep="tail"), budget
+            recent.append(line)
+            used += cost
+        recent.reverse()
+        cut = len(log) - len(recent)                  # log[:cut] is "older"
+
+        parts = []
+        if cut > 0:
+            summary = conv.summary()
+            if summary.get("upto", 0) < cut:
+                self._schedule_refresh(conv, cut)
+            text = summary.get("text", "")
+            room = budget - used
+            if text and room > 32:
+                parts.append("Summary of earlier conversation:\n"
+                             + truncate_tokens(text, room, model, keep="head"))
+        parts.append("\n".join(recent))
+        return "\n\n".join(parts)
+
+    # ---------- rolling summary ------------------------------------------
+    def _schedule_refresh(self, conv, cut: int):
+        running = self._refreshing.get(conv.id)
+        if running and not running.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._refreshing[conv.id] = loop.create_task(self._refresh(conv, cut))
+
+    async def _refresh(self, conv, cut: int):
+        from core.base_brain import get_brain
+
+        summary = conv.summary()
+        upto    = summary.get("upto", 0)
+        new     = conv.history()[upto:cut]
+        if not new:
+            return
+        llm  = get_brain(self.summary_model, 0.2)
+        body = (
+            "Existing summary:\n" + (summary.get("text") or "(none)")
+            + "\n\nNew turns:\n" + "\n".join(_line(m) for m in new)
+        )
+        try:
+            # runs detached from the turn that scheduled it – don't bill that node
+            with context.scope(neuro="history.summary", node=None, cache=None):
+                text = await llm.agenerate_text(body, _SUMMARY_PROMPT.format(words=250))
+        except Exception as e:
+            print(f"[HISTORY] summary refresh failed for {conv.id}: {e}")
+            return
+        conv.set_summary(text.strip(), cut)
+
+
+def settings(*cfgs: dict | None) -> dict:
+    """Merge ``history`` blocks (profile first, neuro last) into render kwargs."""
+    out = {"budget": DEFAULT_BUDGET, "turns": DEFAULT_TURNS}
+    for cfg in cfgs:
+        if cfg and isinstance(cfg.get("history"), dict):
+            out.update({k: v for k, v in cfg["history"].items() if k in ("budget", "turns", "model")})
+    return out
+
+
+history = HistoryManager()
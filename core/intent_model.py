@@ -0,0 +1,255 @@
+"""
+Local intent classifier – a zero-LLM fast path for ``intent_classifier``.
+
+Hashed n-gram features (word 1-2 grams + char 3-grams, crc32 into a fixed
+number of buckets) and a multinomial logistic regression trained with
+NumPy.  Prediction is a sparse row lookup – microseconds – and Brain only
+asks the LLM when the model is missing or less confident than the
+threshold (profile ``"intent_threshold"``, else ``NEO_INTENT_THRESHOLD``).
+
+Training data:
+  * ``logs/intents.jsonl`` – every intent the LLM classifier produced
+    (Brain appends to it; the local model's own guesses are never
+    trained on)
+  * ``conversations/*.json`` – a profile-toggle reply ("neuro-dev profile
+    enabled." …) labels the user message right before it
+
+``/intent retrain`` rebuilds the model, ``/intent stats`` reports held-out
+accuracy, coverage and latency.
+"""
+import glob
+import json
+import os
+import re
+import time
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+
+DIM = 1 << 14
+
+# Brain's toggle replies → the intent that produced them ("Switched to
+# code-dev profile." is left out: both dev_off and general_off say it)
+_TOGGLE_REPLIES = {
+    "neuro-dev profile enabled.":           "dev_on",
+    "neuro-dev profile is already enabled.": "dev_on",
+    "neuro-dev profile is already disabled.": "dev_off",
+    "code-dev profile enabled.":            "code_on",
+    "code-dev profile is already enabled.": "code_on",
+    "back to general profile.":             "code_off",
+    "general profile enabled.":             "general_on",
+    "code-dev profile is already disabled.": "general_off",
+}
+
+_WORD = re.compile(r"[a-z0-9_/']+")
+
+
+def features(text: str, dim: int = DIM) -> tuple[np.ndarray, np.ndarray]:
+    """Sparse, L2-normalised hashed n-grams → (indices, values)."""
+    text  = text.lower().strip()
+    words = _WORD.findall(text)
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    padded = f" {text} "
+    grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    counts: dict[int, float] = {}
+    for g in grams:
+        h = zlib.crc32(g.encode("utf-8")) % dim
+        counts[h] = counts.get(h, 0.0) + 1.0
+    idx  = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    vals = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    norm = float(np.linalg.norm(vals)) or 1.0
+    return idx, vals / norm
+
+
+class _Sparse:
+    """CSR batch of feature rows – just the two products the fit needs."""
+    def __init__(self, rows, dim: int):
+        lens        = np.array([len(i) for i, _ in rows])
+        self.dim    = dim
+        self.starts = np.r_[0, np.cumsum(lens)[:-1]]
+        self.col    = np.concatenate([i for i, _ in rows])
+        self.val    = np.concatenate([v for _, v in rows])[:, None]
+        self.row    = np.repeat(np.arange(len(rows)), lens)
+        self.order  = np.argsort(self.col, kind="stable")
+        self.ucol, self.ustart = np.unique(self.col[self.order], return_index=True)
+
+    def dot(self, W):                                  # X @ W
+        return np.add.reduceat(self.val * W[self.col], self.starts, axis=0)
+
+    def tdot(self, G):                                 # X.T @ G
+        out = np.zeros((self.dim, G.shape[1]), dtype=np.float32)
+        out[self.ucol] = np.add.reduceat((self.val * G[self.row])[self.order], self.ustart, axis=0)
+        return out
+
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    z = z - z.max(axis=-1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+class IntentModel:
+    def __init__(self, path: str, log_path: str, conv_dir: str = "conversations",
+                 threshold: float = 0.85, min_samples: int = 20):
+        self.path        = path
+        self.log_path    = log_path
+        self.conv_dir    = conv_dir
+        self.threshold   = threshold
+        self.min_samples = min_samples
+        # (W, b, labels) – one attribute so a retrain swaps them atomically
+        self.model: tuple[np.ndarray, np.ndarray, list[str]] | None = None
+        self.report: dict = {}
+        self._loaded  = False
+        self.counters = {"local": 0, "fallback": 0, "predict_us": 0.0}
+
+    # ---------- persistence -----------------------------------------------
+    def _load(self):
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+        data = np.load(self.path, allow_pickle=False)
+        self.model  = (data["W"], data["b"], [str(x) for x in data["labels"]])
+        self.report = json.loads(str(data["report"]))
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        W, b, labels = self.model
+        np.savez(self.path, W=W, b=b, labels=np.array(labels), report=json.dumps(self.report))
+
+    @property
+    def ready(self) -> bool:
+        if not self._loaded:
+            self._load()
+        return self.model is not None
+
+    # ---------- inference -------------------------------------------------
+    def predict(self, text: str) -> tuple[str | None, float]:
+        if not self.ready:
+            return None, 0.0
+        W, b, labels = self.model            # read once – train() may swap it meanwhile
+        idx, vals = features(text, W.shape[0])
+        p = _softmax(vals @ W[idx] + b)
+        k = int(p.argmax())
+        return labels[k], float(p[k])
+
+    def classify(self, text: str, threshold: float | None = None) -> str | None:
+        """Confident local label, or None → ask the LLM."""
+        t0 = time.perf_counter()
+        label, prob = self.predict(text)
+        self.counters["predict_us"] += (time.perf_counter() - t0) * 1e6
+        if label is not None and prob >= (threshold or self.threshold):
+            self.counters["local"] += 1
+            return label
+        self.counters["fallback"] += 1
+        return None
+
+    # ---------- training data ---------------------------------------------
+    def log(self, text: str, intent: str, source: str = "llm"):
+        """Append one labelled turn to the training log."""
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "ts":     datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "text":   text, "intent": intent, "source": source,
+            }, ensure_ascii=False) + "\n")
+
+    def examples(self) -> list[tuple[str, str]]:
+        out = []
+        if os.path.exists(self.log_path):
+            with open(self.log_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if row.get("source", "llm") == "llm" and row.get("text", "").strip() and row.get("intent"):
+                        out.append((row["text"], str(row["intent"]).strip().lower()))
+        for fp in glob.glob(os.path.join(self.conv_dir, "*.json")):
+            if fp.endswith(".summary.json"):
+                continue
+            try:
+                with open(fp, encoding="utf-8") as f:
+                    log = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            for prev, msg in zip(log, log[1:]):
+                label = _TOGGLE_REPLIES.get(str(msg.get("text", "")).strip().lower())
+                text  = str(prev.get("text", "")).strip()
+                # slash commands never reach the classifier – don't learn them
+                if label and msg.get("sender") == "assistant" and prev.get("sender") == "user" \
+                        and text and not text.startswith("/"):
+                    out.append((text, label))
+        return out
+
+    # ---------- training --------------------------------------------------
+    def train(self, *, epochs: int = 300, lr: float = 0.5, l2: float = 1e-4,
+              dim: int = DIM) -> dict:
+        """Fit on every example; accuracy is measured on a 1-in-5 holdout first."""
+        data = self.examples()
+        labels = sorted({y for _, y in data})
+        if len(data) < self.min_samples or len(labels) < 2:
+            return {"ok": False,
+                    "reason": f"need ≥{self.min_samples} examples and ≥2 intents "
+                              f"(have {len(data)} / {len(labels)})"}
+
+        rows = [features(x, dim) for x, _ in data]
+        y    = np.array([labels.index(l) for _, l in data])
+        hold = np.arange(len(data)) % 5 == 0
+
+        t0 = time.perf_counter()
+        W, b = self._fit(_Sparse([r for r, h in zip(rows, hold) if not h], dim),
+                         y[~hold], len(labels), epochs, lr, l2)
+        P    = _softmax(_Sparse([r for r, h in zip(rows, hold) if h], dim).dot(W) + b)
+        conf = P.max(axis=1)
+        hit  = P.argmax(axis=1) == y[hold]
+        over = conf >= self.threshold
+
+        # final model on everything
+        W, b = self._fit(_Sparse(rows, dim), y, len(labels), epochs, lr, l2)
+        self.model  = (W, b, labels)
+        self.report = {
+            "trained_at":         datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "examples":           len(data),
+            "intents":            {l: int((y == i).sum()) for i, l in enumerate(labels)},
+            "holdout":            int(hold.sum()),
+            "accuracy":           round(float(hit.mean()), 4) if hold.any() else None,
+            "coverage":           round(float(over.mean()), 4) if hold.any() else None,
+            "accuracy_confident": round(float(hit[over].mean()), 4) if over.any() else None,
+            "train_secs":         round(time.perf_counter() - t0, 2),
+        }
+        self._save()
+        self._loaded = True
+        return {"ok": True, **self.report}
+
+    @staticmethod
+    def _fit(X: _Sparse, y, k, epochs, lr, l2):
+        n = len(y)
+        Y = np.eye(k, dtype=np.float32)[y]
+        W = np.zeros((X.dim, k), dtype=np.float32)
+        b = np.zeros(k, dtype=np.float32)
+        for _ in range(epochs):
+            G  = (_softmax(X.dot(W) + b) - Y) / n
+            W -= lr * (X.tdot(G) + l2 * W)
+            b -= lr * G.sum(axis=0)
+        return W, b
+
+    def stats(self) -> dict:
+        asked = self.counters["local"] + self.counters["fallback"]
+        return {
+            "ready":      self.ready,
+            "threshold":  self.threshold,
+            "local":      self.counters["local"],
+            "fallback":   self.counters["fallback"],
+            "local_rate": round(self.counters["local"] / asked, 4) if asked else 0.0,
+            "predict_us": round(self.counters["predict_us"] / asked, 1) if asked else 0.0,
+            "model":      self.report,
+        }
+
+
+intent_model = IntentModel(
+    path=os.getenv("NEO_INTENT_MODEL", os.path.join(".cache", "intent_model.npz")),
+    log_path=os.getenv("NEO_INTENT_LOG", os.path.join("logs", "intents.jsonl")),
+    threshold=float(os.getenv("NEO_INTENT_THRESHOLD", "0.85")),
+)
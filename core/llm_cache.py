@@ -0,0 +1,268 @@
+"""
+Content-addressed cache for LLM completions.
+
+Key = sha256 of (model, temperature, messages, response_format), so the
+same prompt against the same model always lands on the same entry.
+
+Two tiers:
+  * MemoryLRU  – bounded in-process LRU, checked first
+  * DiskCache  – SQLite file that survives restarts (hits are promoted);
+                 read off the event loop, written by one batching thread
+
+Every entry carries an absolute expiry; expired rows are treated as misses
+and dropped lazily.  Neuros opt in through conf.json:
+
+    "cache": true                       # default TTL
+    "cache": {"ttl": 600, "disk": false}
+"""
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryLRU:
+    def __init__(self, max_items: int = 512):
+        self.max_items = max_items
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+    def get(self, key: str):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires and expires < time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: str, value, expires: float = 0.0):
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskCache:
+    """
+    SQLite tier.  Reads run on the calling thread (LLMCache.aget sends them
+    to a worker thread); writes are queued to one writer thread that applies
+    whatever has piled up and commits once per batch, so puts never wait
+    for the disk.  The database is opened by whichever of those threads
+    touches it first – never by the event loop.
+    """
+    def __init__(self, path: str, batch: int = 64):
+        self.path    = path
+        self.batch   = batch
+        self._lock   = threading.Lock()         # the connection
+        self._start  = threading.Lock()         # the writer thread
+        self._db     = None
+        self._queue  = queue.SimpleQueue()
+        self._writer = None
+
+    def _conn(self) -> sqlite3.Connection:
+        # caller holds self._lock
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            # WAL: readers don't wait for the writer, and commits need fewer fsyncs
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            db.commit()
+            self._db = db
+        return self._db
+
+    # ---------- writer thread ---------------------------------------------
+    def _write(self, op):
+        with self._start:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._drain, name="llm-cache-writer",
+                                                daemon=True)
+                self._writer.start()
+        self._queue.put(op)
+
+    def _drain(self):
+        while True:
+            ops = [self._queue.get()]
+            while len(ops) < self.batch:
+                try:
+                    ops.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self._lock:
+                db = self._conn()
+                for op in ops:
+                    if op is not None and op[0] == "sql":
+                        db.execute(op[1], op[2])
+                db.commit()
+            for op in ops:
+                if op is not None and op[0] == "flush":
+                    op[1].set()
+            if None in ops:
+                return
+
+    def flush(self, timeout: float | None = None):
+        """Wait until every queued write is committed."""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait(timeout)
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    # ---------- entries ---------------------------------------------------
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn().execute(
+                "SELECT value, expires FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None, 0.0
+        value, expires = row
+        if expires and expires < time.time():
+            self._write(("sql", "DELETE FROM entries WHERE key = ?", (key,)))
+            return None, 0.0
+        return value, expires
+
+    def put(self, key: str, value: str, expires: float = 0.0):
+        self._write(("sql", "INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)",
+                     (key, value, expires)))
+
+    def clear(self):
+        self._write(("sql", "DELETE FROM entries", ()))
+        self.flush()
+
+    def __len__(self):
+        self.flush()
+        with self._lock:
+            return self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+class LLMCache:
+    def __init__(self, *, max_items: int = 512, path: str | None = None,
+                 default_ttl: float = 86400.0, enabled: bool = True):
+        self.enabled     = enabled
+        self.default_ttl = default_ttl
+        self.memory      = MemoryLRU(max_items)
+        self._path       = path
+        self._disk       = None
+        self.counters    = {"hits_memory": 0, "hits_disk": 0, "misses": 0, "stores": 0}
+
+    @property
+    def disk(self) -> DiskCache | None:
+        # cheap: the SQLite file is only opened by the reader / writer threads
+        if self._disk is None and self._path:
+            self._disk = DiskCache(self._path)
+        return self._disk
+
+    # ---------- keys ------------------------------------------------------
+    @staticmethod
+    def key(model, temperature, messages, response_format=None) -> str:
+        blob = json.dumps(
+            {"model": model, "temperature": temperature,
+             "messages": messages, "response_format": response_format},
+            sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+        )
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    # ---------- lookup / store -------------------------------------------
+    def get(self, key: str, *, disk: bool = True):
+        value = self.memory.get(key)
+        if value is not None:
+            self.counters["hits_memory"] += 1
+            return value
+        if disk and self.disk is not None:
+            value, expires = self.disk.get(key)
+            if value is not None:
+                self.counters["hits_disk"] += 1
+                self.memory.put(key, value, expires)
+                return value
+        self.counters["misses"] += 1
+        return None
+
+    async def aget(self, key: str, *, disk: bool = True):
+        """``get`` for the event loop – the SQLite read runs in a worker thread."""
+        value = self.memory.get(key)
+        if value is not None:
+            self.counters["hits_memory"] += 1
+            return value
+        if disk and self.disk is not None:
+            value, expires = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                self.counters["hits_disk"] += 1
+                self.memory.put(key, value, expires)
+                return value
+        self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, value: str, *, ttl: float | None = None, disk: bool = True):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl else 0.0
+        self.memory.put(key, value, expires)
+        if disk and self.disk is not None:
+            self.disk.put(key, value, expires)
+        self.counters["stores"] += 1
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def close(self):
+        """Commit pending disk writes and stop the writer thread."""
+        if self._disk is not None:
+            self._disk.close()
+
+    def stats(self) -> dict:
+        hits  = self.counters["hits_memory"] + self.counters["hits_disk"]
+        total = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate":     round(hits / total, 4) if total else 0.0,
+            "memory_items": len(self.memory),
+            "enabled":      self.enabled,
+        }
+
+
+def policy(spec: dict) -> dict | None:
+    """Normalise the conf.json ``cache`` knob into ``{"ttl":…, "disk":…}`` or None."""
+    raw = spec.get("cache", False)
+    if not raw:
+        return None
+    if raw is True:
+        return {"ttl": None, "disk": True}
+    if isinstance(raw, dict):
+        return {"ttl": raw.get("ttl"), "disk": raw.get("disk", True)}
+    return None
+
+
+cache = LLMCache(
+    max_items=int(os.getenv("NEO_LLM_CACHE_ITEMS", "512")),
+    path=os.getenv("NEO_LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite")) or None,
+    default_ttl=float(os.getenv("NEO_LLM_CACHE_TTL", "86400")),
+    enabled=os.getenv("NEO_LLM_CACHE", "on").lower() not in ("0", "off", "false", "no"),
+)
@@ -0,0 +1,98 @@
+"""
+Task-local stdout / stderr capture for neuros.
+
+``contextlib.redirect_stdout`` swaps ``sys.stdout`` for the whole process,
+so two neuros running at the same time steal each other's output – and,
+when they finish out of order, leave ``sys.stdout`` pointing at a dead
+buffer.  Instead ``sys.stdout`` and ``sys.stderr`` are replaced once by a
+router that looks up the current buffer in a ContextVar: inside
+``capture()`` writes go to that task's buffer, everywhere else to the
+real stream.
+
+The ContextVar follows the neuro into ``"executor": "thread"`` workers and
+``asyncio.to_thread`` (both copy the context); process workers capture
+with the same router and send the text back.  NeuroFactory installs the
+router before loading neuros, so a ``logging.StreamHandler`` a neuro
+creates at import time is routed too.  A buffer keeps the first
+``NEO_LOG_MAX_CHARS`` characters (default 65536) and notes how much it
+dropped, so a chatty neuro can't grow a node's logs without bound.
+"""
+import contextlib
+import io
+import os
+import sys
+from contextvars import ContextVar
+
+MAX_CHARS = int(os.getenv("NEO_LOG_MAX_CHARS", "65536"))
+
+_buf: ContextVar[io.StringIO | None] = ContextVar("neuro_stdout", default=None)
+
+
+class _Capped(io.StringIO):
+    """StringIO keeping the first *limit* characters; the rest is only counted."""
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit   = limit
+        self.dropped = 0
+
+    def write(self, s):
+        room = self.limit - self.tell()
+        if len(s) <= room:
+            return super().write(s)
+        if room > 0:
+            super().write(s[:room])
+        self.dropped += len(s) - max(room, 0)
+        return len(s)
+
+    def getvalue(self):
+        text = super().getvalue()
+        return text + f"\n… [+{self.dropped} chars dropped]" if self.dropped else text
+
+
+class _Router(io.TextIOBase):
+    def __init__(self, stream):
+        self.stream = stream
+
+    def _target(self):
+        return _buf.get() or self.stream
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def flush(self):
+        self._target().flush()
+
+    def isatty(self):
+        return self.stream.isatty()
+
+    @property
+    def encoding(self):
+        return getattr(self.stream, "encoding", "utf-8")
+
+    def fileno(self):
+        return self.stream.fileno()
+
+
+def install():
+    if not isinstance(sys.stdout, _Router):
+        sys.stdout = _Router(sys.stdout)
+    if not isinstance(sys.stderr, _Router):
+        sys.stderr = _Router(sys.stderr)
+
+
+def console(*args, **kw):
+    """``print`` to the real stdout even inside ``capture()`` – for server diagnostics."""
+    out = sys.stdout
+    print(*args, **kw, file=out.stream if isinstance(out, _Router) else out)
+
+
+@contextlib.contextmanager
+def capture(limit: int = MAX_CHARS):
+    """Collect everything the current task prints into a (capped) StringIO."""
+    install()
+    buf   = _Capped(limit)
+    token = _buf.set(buf)
+    try:
+        yield buf
+    finally:
+        _buf.reset(token)
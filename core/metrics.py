@@ -0,0 +1,133 @@
+"""
+Per-call LLM accounting.
+
+Every BaseBrain call produces one *sample*:
+
+    {cid, node, neuro, model, queue_ms, ttfb_ms, latency_ms,
+     prompt_tokens, completion_tokens, cached, coalesced, retries, error}
+
+``queue_ms``   – from entering the call until the request went out
+                 (cache lookup, rate-limit / concurrency queue, backoff,
+                 waiting on an identical in-flight call)
+``ttfb_ms``    – request sent → response headers / first streamed token
+``latency_ms`` – the whole call as the neuro saw it
+
+Samples are published as ``node.metrics`` hub events (``kind: "llm"``)
+by BaseBrain and folded in here into per-neuro and per-model aggregates
+with latency histograms, which ``GET /metrics`` exposes.
+"""
+import bisect
+from collections import deque
+
+# upper bounds in ms; the last bucket is open-ended
+BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class Histogram:
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.n      = 0
+        self.total  = 0.0
+        self.max    = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.n     += 1
+        self.total += value
+        self.max    = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Bucket upper bound below which ``q`` of the samples fall."""
+        if not self.n:
+            return 0.0
+        rank, seen = q * self.n, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(float(self.bounds[i]), self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def stats(self) -> dict:
+        return {
+            "count":   self.n,
+            "mean":    round(self.total / self.n, 1) if self.n else 0.0,
+            "p50":     round(self.quantile(0.50), 1),
+            "p90":     round(self.quantile(0.90), 1),
+            "p99":     round(self.quantile(0.99), 1),
+            "max":     round(self.max, 1),
+            "buckets": dict(zip([*map(str, self.bounds), "+Inf"], self.counts)),
+        }
+
+
+class _Agg:
+    """Counters + histograms for one neuro (or one model)."""
+    def __init__(self):
+        self.calls = self.cached = self.coalesced = self.errors = self.retries = 0
+        self.prompt_tokens = self.completion_tokens = 0
+        self.queue   = Histogram()
+        self.ttfb    = Histogram()
+        self.latency = Histogram()
+
+    def add(self, s: dict):
+        self.calls += 1
+        self.cached    += bool(s.get("cached"))
+        self.coalesced += bool(s.get("coalesced"))
+        self.errors    += bool(s.get("error"))
+        self.retries   += s.get("retries") or 0
+        self.prompt_tokens     += s.get("prompt_tokens") or 0
+        self.completion_tokens += s.get("completion_tokens") or 0
+        for hist, field in ((self.queue, "queue_ms"), (self.ttfb, "ttfb_ms"),
+                            (self.latency, "latency_ms")):
+            if s.get(field) is not None:
+                hist.add(s[field])
+
+    def stats(self) -> dict:
+        return {
+            "calls":             self.calls,
+            "cached":            self.cached,
+            "coalesced":         self.coalesced,
+            "errors":            self.errors,
+            "retries":           self.retries,
+            "prompt_tokens":     self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "queue_ms":          self.queue.stats(),
+            "ttfb_ms":           self.ttfb.stats(),
+            "latency_ms":        self.latency.stats(),
+        }
+
+
+class LLMMetrics:
+    def __init__(self, keep: int = 500):
+        self.by_neuro: dict[str, _Agg] = {}
+        self.by_model: dict[str, _Agg] = {}
+        self.recent: deque[dict] = deque(maxlen=keep)
+
+    def record(self, sample: dict):
+        self.by_neuro.setdefault(sample.get("neuro") or "-", _Agg()).add(sample)
+        self.by_model.setdefault(sample.get("model") or "-", _Agg()).add(sample)
+        self.recent.append(sample)
+
+    def samples(self, *, cid: str | None = None, neuro: str | None = None,
+                limit: int = 50) -> list[dict]:
+        out = [s for s in self.recent
+               if (cid is None or s.get("cid") == cid)
+               and (neuro is None or s.get("neuro") == neuro)]
+        return out[-limit:]
+
+    def stats(self, neuro: str | None = None) -> dict:
+        if neuro is not None:
+            agg = self.by_neuro.get(neuro)
+            return agg.stats() if agg else {}
+        return {
+            "neuros": {k: v.stats() for k, v in self.by_neuro.items()},
+            "models": {k: v.stats() for k, v in self.by_model.items()},
+        }
+
+    def reset(self):
+        self.by_neuro.clear()
+        self.by_model.clear()
+        self.recent.clear()
+
+
+metrics = LLMMetrics()
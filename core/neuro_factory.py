@@ -1,20 +1,88 @@
-import json, types, pathlib, sys, textwrap, asyncio, fnmatch, io, contextlib
+import json, types, pathlib, sys, textwrap, asyncio, fnmatch, io, contextlib, hashlib, os
 from core.base_neuro import BaseNeuro
-from core.base_brain import BaseBrain
+from core.base_brain import get_brain
+from core import context, llm_cache, logcapture
+from core.history import history, settings as history_settings
+from core.neuro_index import NeuroIndex, document
+from core.neuro_manifest import manifest, signature
+from core.neuro_memo import memo, policy as memo_policy
+from core.neuro_pool import pools
+from core.profiler import profiler
+
+try:
+    from watchdog.observers import Observer
+except ImportError:          # optional – no hot reload without it
+    Observer = None
+
+# files whose change reloads their neuro folder
+_WATCHED = {"conf.json", "code.py", "prompt.txt"}
+# watchdog also reports opened / closed – reading a file must not trigger a reload
+_EDITS = {"created", "modified", "deleted", "moved"}
+# quiet period before a changed folder is reloaded (editors write in bursts)
+RELOAD_DEBOUNCE = float(os.getenv("NEO_RELOAD_DEBOUNCE", "0.3"))
+# compile a neuro's code.py on its first run (off = all at startup, as before)
+LAZY = os.getenv("NEO_NEURO_LAZY", "on").lower() not in ("0", "off", "false", "no")
+
+
+class NeuroTimeout(TimeoutError):
+    """A neuro ran past its conf.json ``timeout`` and was cancelled."""
+    def __init__(self, name: str, limit: float):
+        super().__init__(f"{name} exceeded its {limit}s timeout")
+        self.neuro, self.limit = name, limit
+
+
+class _Changes:
+    """watchdog handler: runs on the observer thread, hands paths to the loop."""
+    def __init__(self, factory, loop):
+        self.factory = factory
+        self.loop    = loop
+
+    def dispatch(self, event):
+        if event.event_type not in _EDITS:
+            return
+        if event.is_directory and event.event_type not in ("deleted", "moved"):
+            return
+        for p in (event.src_path, getattr(event, "dest_path", None)):
+            if not p:
+                continue
+            p = pathlib.Path(os.fsdecode(p))
+            if event.is_directory or p.name in _WATCHED:
+                self.loop.call_soon_threadsafe(self.factory._changed, p, event.is_directory)
+
 
 class NeuroFactory:
     """
-    * loads every conf*.json
-    * hot-reloads on change
-    * injects a ready-made BaseBrain into the neuro's state as   state["__llm"]
+    * indexes every conf.json from the manifest (core.neuro_manifest) and
+      compiles a neuro's code on its first run or profile warm-up
+    * hot-reloads a neuro folder when its conf.json / code.py / prompt.txt
+      changes (one watchdog observer, debounced – no polling)
+    * injects a pooled BaseBrain into the neuro's state as   state["__llm"]
     """
     def __init__(self, dir="neuros"):
         self.dir = pathlib.Path(dir)
         self.reg = {}
+        # name → conf.json spec / compiled code module (only neuros that ran or were warmed)
+        self.specs = {}
+        self.mods = {}
+        # name → hash of conf/code/prompt; changes on every hot reload
+        self.digests = {}
+        # neuros safe to run again after a restart interrupted them
+        self.idempotent = set()
+        # name → inspect.Signature of run() / the module's "alias" map – see core.flow_compiler
+        self.signatures = {}
+        self.alias_maps = {}
+        # neuro folder (resolved) → name, for reloading / unloading by path
+        self.folders = {}
+        self._pending = {}
+        self._observer = None
+        # BM25 over name / description / inputs / prompt for planner retrieval
+        self.index = NeuroIndex()
         # profile-specific neuro patterns:   cid → [glob, …]
         self.patterns = {}
+        # route stdout / stderr before neuros load – loggers they create keep the router
+        logcapture.install()
         self._load_all()
-        asyncio.create_task(self._watch())
+        self._watch()
 
     # ---------- loading ----------------------------------------------------
     def _safe_exec(self, src: str, mod_name: str):
@@ -26,60 +94,172 @@ class NeuroFactory:
 
     def _load_all(self):
         """
-        Find every   neuros/<neuro_name>/neuro.json   (any depth)
-        and load/compile it.
+        Find every   neuros/<neuro_name>/conf.json   (any depth)
+        and register it; code is compiled lazily unless NEO_NEURO_LAZY=off.
         """
-        for p in self.dir.rglob("conf.json"):         
-            self._load(p)
+        for p in self.dir.rglob("conf.json"):
+            try:
+                self._load(p)
+            except Exception as e:
+                print(f"[factory] skipping {p}: {e!r}")
+        manifest.save()
+        if not LAZY:
+            self.warm(["*"])
 
-    async def _watch(self):
-        """
-        Hot-reload neuro folders.  Walk through every neuro.json once per second
-        and reload those whose mtime changed.
-        """
-        stamp = {p: p.stat().st_mtime for p in self.dir.rglob("conf.json")}
-        while True:
-            await asyncio.sleep(1)
-            for p in self.dir.rglob("conf.json"):
-                m = p.stat().st_mtime
-                if m != stamp.get(p):
-                    print(f"[factory] reload {p}")
-                    self._load(p)
-                    stamp[p] = m
+    def _watch(self):
+        """Start the watchdog observer (needs the running event loop)."""
+        if Observer is None:
+            print("[factory] watchdog not installed – neuro hot reload off")
+            return
+        self._observer = Observer()
+        self._observer.schedule(_Changes(self, asyncio.get_running_loop()),
+                                str(self.dir), recursive=True)
+        self._observer.daemon = True
+        self._observer.start()
+
+    def close(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+        for h in self._pending.values():
+            h.cancel()
+        self._pending.clear()
 
+    def _changed(self, path: pathlib.Path, is_dir: bool):
+        """A watched path changed – (re)start its folder's debounce timer."""
+        folder = (path if is_dir else path.parent).resolve()
+        if folder not in self.folders and not (folder / "conf.json").exists():
+            return
+        h = self._pending.pop(folder, None)
+        if h is not None:
+            h.cancel()
+        self._pending[folder] = asyncio.get_running_loop().call_later(
+            RELOAD_DEBOUNCE, self._reload, folder)
+
+    def _reload(self, folder: pathlib.Path):
+        self._pending.pop(folder, None)
+        conf = folder / "conf.json"
+        if not conf.exists():
+            self._unload(folder)
+            return
+        print(f"[factory] reload {folder}")
+        try:
+            self._load(conf)
+        except Exception as e:             # half-written code.py etc. – keep the old one
+            print(f"[factory] reload of {folder} failed: {e!r}")
+        manifest.save()
+
+    def _unload(self, folder: pathlib.Path):
+        name = self.folders.pop(folder, None)
+        if name is None:
+            return
+        print(f"[factory] unload {name}")
+        self._drop(name)
+        manifest.forget(folder / "conf.json")
+        manifest.save()
+
+    def _drop(self, name: str):
+        self.reg.pop(name, None)
+        self.mods.pop(name, None)
+        self.specs.pop(name, None)
+        self.digests.pop(name, None)
+        self.signatures.pop(name, None)
+        self.alias_maps.pop(name, None)
+        self.idempotent.discard(name)
+        self.index.remove(name)
+        memo.invalidate(name)
 
     def _load(self, path: pathlib.Path):
         folder = path.parent                          # neuros/<n>/
         try:
-            spec = json.loads(path.read_text(encoding="utf-8"))
+            entry = manifest.entry(path)              # conf + syntax tree only, no exec
         except json.JSONDecodeError:
             print(f"[factory] skipping invalid JSON in {path}")
             return
         except UnicodeDecodeError:
             print(f"[factory] skipping file with encoding issues in {path}")
             return
+        spec, prompt_txt, digest = entry["spec"], entry["prompt"], entry["digest"]
+        name = spec["name"]
 
         # ---------------------------------------------------------------- code
-        code_path = folder / "code.py"
-        code_src  = code_path.read_text(encoding="utf-8")
-        mod       = self._safe_exec(code_src, f"neuro_{spec['name']}")
+        # compiled on first run (or warm-up); a reload recompiles what was loaded,
+        # so a broken edit fails here and the previous version stays
+        where = spec.get("executor", "loop")    # loop | thread | process (core.neuro_pool)
+        fresh = None
+        if name in self.mods and where != "process":
+            fresh = self._safe_exec((folder / "code.py").read_text(encoding="utf-8"),
+                                    f"neuro_{name}")
+        self.mods.pop(name, None)
+        if fresh is not None:
+            self.mods[name] = fresh
+
+        self.signatures[name] = signature(entry["params"])
+        self.alias_maps[name] = entry["alias"]
+        self.specs[name] = spec
+        key = folder.resolve()
+        if self.folders.get(key) not in (None, name):
+            self._drop(self.folders[key])          # renamed in conf.json
+        self.folders[key] = name
 
         # ---------------------------------------------------------------- prompt
-        prompt_path = folder / "prompt.txt"
-        prompt_txt  = prompt_path.read_text(encoding="utf-8") if prompt_path.exists() else None
+        self.index.update(name, document(spec, prompt_txt))
+        if self.digests.get(name) not in (None, digest):
+            memo.invalidate(name)                 # edited → old outputs are stale
+        self.digests[name] = digest
+        if spec.get("idempotent") or spec.get("pure"):
+            self.idempotent.add(name)
+        else:
+            self.idempotent.discard(name)
 
         # ---------------------------------------------------------------- model settings
         model = spec.get("model", "gpt-4o-mini")
         temp  = spec.get("temperature", 0.7)
+        base  = spec.get("base_url")
+        cache = llm_cache.policy(spec)          # None → LLM calls bypass the cache
+        hist  = "history" in spec               # own window, merged over the profile's
+        pure  = memo_policy(spec)               # None → always run
+        limit = spec.get("timeout")             # seconds per run; the turn deadline still applies
+        ins   = spec.get("inputs", [])
+        code  = []                              # process mode: source, read on first call
 
         async def _runner(state, **kw):
-            state["__llm"]    = BaseBrain(model, temp)
+            # pure neuros: same code + same arguments → same output
+            if pure:
+                key = memo.key(digest, ins, state, kw)
+                hit = memo.get(name, key)
+                if hit is not None:
+                    return hit
+
+            state["__llm"]    = get_brain(model, temp, base)
             state["__prompt"] = prompt_txt
+            # neuros with their own "history" budget get a window rendered for them
+            if hist and state.get("__conv"):
+                state["__history"] = history.render(
+                    state["__conv"],
+                    **history_settings({"history": state.get("__profile_history")}, spec))
+            if where == "process" and not code:
+                code.append((folder / "code.py").read_text(encoding="utf-8"))
+            mod = self.module(name) if where != "process" else None
 
-            # ── capture anything the neuro prints ──────────────────────────
-            buf = io.StringIO()
-            with contextlib.redirect_stdout(buf):
-                res = await mod.run(state, **kw)
+            # ── capture anything the neuro prints (task-local, see logcapture)
+            with logcapture.capture() as buf, context.scope(neuro=name, cache=cache):
+                if where == "thread":
+                    call = pools.thread(mod.run, state, kw)
+                elif where == "process":
+                    call = pools.process(name, digest, code[0], (model, temp, base),
+                                         prompt_txt, state, kw)
+                else:
+                    call = mod.run(state, **kw)
+                try:
+                    async with asyncio.timeout(limit) as tm:
+                        res = await profiler.run(name, call)
+                except TimeoutError:
+                    # only our own limit is terminal – a timeout the neuro
+                    # raised itself (socket, httpx, …) is an ordinary failure
+                    if tm.expired():
+                        raise NeuroTimeout(name, limit) from None
+                    raise
 
             logs = buf.getvalue()
             if logs:
@@ -87,18 +267,48 @@ class NeuroFactory:
                     res = {}
                 # stash logs so the Executor can forward them
                 res["__logs"] = logs
+            if pure:
+                memo.put(name, key, res, pure["ttl"])
             return res
 
-        self.reg[spec["name"]] = BaseNeuro(
-            spec["name"],
+        self.reg[name] = BaseNeuro(
+            name,
             _runner,
             spec.get("inputs", []),
             spec.get("outputs", []),
             spec.get("description", "")
         )
 
+    def module(self, name: str) -> types.ModuleType:
+        """The neuro's code module, compiled on first use."""
+        mod = self.mods.get(name)
+        if mod is None:
+            folder = next(f for f, n in self.folders.items() if n == name)
+            mod = self._safe_exec((folder / "code.py").read_text(encoding="utf-8"),
+                                  f"neuro_{name}")
+            self.mods[name] = mod
+            print(f"[factory] compiled {name}")
+        return mod
+
+    def warm(self, patterns):
+        """Compile the neuros matching *patterns* now instead of on their first run."""
+        for name in list(self.reg):
+            if (name not in self.mods and self.specs[name].get("executor") != "process"
+                    and any(fnmatch.fnmatch(name, p) for p in patterns)):
+                try:
+                    self.module(name)
+                except Exception as e:
+                    print(f"[factory] warm-up of {name} failed: {e!r}")
 
     # ---------- public helpers --------------------------------------------
+    @property
+    def aliases(self) -> dict:
+        """alias → neuro name, merged from every loaded module's ``alias`` map."""
+        out = {}
+        for m in self.alias_maps.values():
+            out.update(m)
+        return out
+
     async def run(self, name: str, state: dict, **kw):
         return await self.reg[name].run(state, **kw)
 
@@ -123,6 +333,22 @@ class NeuroFactory:
             names = [n for n in names if n.startswith("dev_")]
         return names
 
+    def relevant(self, cid: str | None, goal: str, k: int, *, pin=(),
+                 min_score: float = 1.0) -> list[str]:
+        """The *k* visible neuros most relevant to *goal* (see core.neuro_index)."""
+        return self.index.top(goal, self.catalogue(cid), k, pin=pin, min_score=min_score)
+
+    def fingerprint(self, cid: str | None = None) -> str:
+        """Hash of every neuro visible to *cid* – changes when any of them reloads."""
+        h = hashlib.sha1()
+        for n in sorted(self.catalogue(cid)):
+            h.update(f"{n}:{self.digests.get(n, '')};".encode("utf-8"))
+        return h.hexdigest()
+
+    def stats(self) -> dict:
+        return {"neuros": len(self.reg), "compiled": len(self.mods), "lazy": LAZY,
+                "manifest": manifest.stats()}
+
     def describe(self, cid: str | None = None, group: str | None = None):
         return [{"name": n, "desc": self.reg[n].desc}
                 for n in self.catalogue(cid, group)]
@@ -0,0 +1,105 @@
+"""
+BM25 index over the neuro catalogue.
+
+Each neuro is one document built from its conf.json name, description and
+inputs plus its prompt.txt.  The name and description are repeated so they
+outweigh a long prompt.  NeuroFactory updates the index on every (re)load,
+one document at a time, so hot reloads never rebuild it from scratch.
+
+``top(goal, names, k)`` ranks the candidate names for a goal.  Brain sends
+the planner only the best ``k`` (plus pinned neuros such as the replier)
+and falls back to the full list when nothing scores at least ``min_score``.
+"""
+import math
+import re
+from collections import Counter
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOP  = {"a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "is", "it",
+          "with", "by", "be", "as", "at", "this", "that", "you", "your", "from", "me",
+          "my", "i", "please", "can", "do"}
+
+
+def tokenize(text: str) -> list[str]:
+    out = []
+    for t in _TOKEN.findall(text.lower().replace("_", " ")):
+        if t in _STOP:
+            continue
+        if len(t) > 3 and t.endswith("s") and not t.endswith("ss"):
+            t = t[:-1]                       # crude plural folding
+        out.append(t)
+    return out
+
+
+def document(spec: dict, prompt: str | None = None) -> str:
+    inputs = spec.get("inputs") or []
+    if isinstance(inputs, dict):
+        inputs = list(inputs)
+    name = spec.get("name", "")
+    desc = spec.get("description", "")
+    return " ".join([name] * 3 + [desc] * 2 + [" ".join(map(str, inputs)), prompt or ""])
+
+
+class NeuroIndex:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.tf:  dict[str, Counter] = {}
+        self.len: dict[str, int]     = {}
+        self.df   = Counter()
+        self.counters = {"queries": 0, "fallbacks": 0, "kept": 0}
+
+    # ---------- maintenance -----------------------------------------------
+    def update(self, name: str, text: str):
+        self.remove(name)
+        tf = Counter(tokenize(text))
+        self.tf[name], self.len[name] = tf, sum(tf.values())
+        self.df.update(tf.keys())
+
+    def remove(self, name: str):
+        old = self.tf.pop(name, None)
+        if old is not None:
+            self.df.subtract(old.keys())
+            self.len.pop(name, None)
+
+    # ---------- ranking ---------------------------------------------------
+    def scores(self, query: str, names) -> dict[str, float]:
+        n     = len(self.tf) or 1
+        avgdl = (sum(self.len.values()) / n) or 1.0
+        terms = set(tokenize(query))
+        out = {}
+        for name in names:
+            tf = self.tf.get(name)
+            if not tf:
+                continue
+            dl, s = self.len[name], 0.0
+            for t in terms:
+                f = tf.get(t)
+                if not f:
+                    continue
+                idf = math.log(1 + (n - self.df[t] + 0.5) / (self.df[t] + 0.5))
+                s  += idf * f * (self.k1 + 1) / (f + self.k1 * (1 - self.b + self.b * dl / avgdl))
+            out[name] = s
+        return out
+
+    def top(self, query: str, names: list[str], k: int, *, pin=(), min_score: float = 1.0) -> list[str]:
+        """Best *k* of *names* for *query* (catalogue order kept), or all of them."""
+        self.counters["queries"] += 1
+        if not k or len(names) <= k:
+            self.counters["kept"] += len(names)
+            return names
+        scores = self.scores(query, names)
+        best   = sorted(scores, key=scores.get, reverse=True)[:k]
+        if not best or scores[best[0]] < min_score:
+            # nothing clearly relevant – the planner gets the whole catalogue
+            self.counters["fallbacks"] += 1
+            self.counters["kept"] += len(names)
+            return names
+        keep = {n for n in best if scores[n] > 0} | {p for p in pin if p in names}
+        out  = [n for n in names if n in keep]
+        self.counters["kept"] += len(out)
+        return out
+
+    def stats(self) -> dict:
+        q = self.counters["queries"]
+        return {**self.counters, "documents": len(self.tf),
+                "avg_kept": round(self.counters["kept"] / q, 1) if q else 0.0}
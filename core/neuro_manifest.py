@@ -0,0 +1,152 @@
+"""
+Neuro manifest – everything NeuroFactory needs before a neuro's code runs.
+
+Per ``conf.json`` the manifest keeps the spec, the prompt, the content
+digest, the ``run()`` parameters and the module-level ``alias`` map.  The
+last two are read from the syntax tree of ``code.py``, so the catalogue,
+planner retrieval and core.flow_compiler work without executing a single
+neuro module (and without their top-level imports).
+
+Entries are cached in ``NEO_NEURO_MANIFEST`` (default
+``.cache/neuro_manifest.json``) under the conf path and reused while the
+size and mtime of conf.json, code.py and prompt.txt are unchanged.
+"""
+import ast
+import hashlib
+import inspect
+import json
+import os
+import pathlib
+
+_FILES = ("conf.json", "code.py", "prompt.txt")
+
+
+def _stamp(folder: pathlib.Path) -> list:
+    out = []
+    for name in _FILES:
+        try:
+            st = (folder / name).stat()
+        except FileNotFoundError:
+            out.append(None)
+        else:
+            out.append([st.st_mtime_ns, st.st_size])
+    return out
+
+
+def _run_params(tree: ast.Module) -> list | None:
+    """``[[name, kind, has_default], …]`` of the module's top-level ``run``."""
+    fn = None
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == "run":
+            fn = node
+    if fn is None:
+        return None
+    a, out = fn.args, []
+    positional = a.posonlyargs + a.args
+    first_default = len(positional) - len(a.defaults)
+    for i, p in enumerate(positional):
+        kind = "POSITIONAL_ONLY" if i < len(a.posonlyargs) else "POSITIONAL_OR_KEYWORD"
+        out.append([p.arg, kind, i >= first_default])
+    if a.vararg:
+        out.append([a.vararg.arg, "VAR_POSITIONAL", False])
+    for p, d in zip(a.kwonlyargs, a.kw_defaults):
+        out.append([p.arg, "KEYWORD_ONLY", d is not None])
+    if a.kwarg:
+        out.append([a.kwarg.arg, "VAR_KEYWORD", False])
+    return out
+
+
+def _alias(tree: ast.Module) -> dict:
+    """A literal top-level ``alias = {…}`` (e.g. code_planner's)."""
+    for node in tree.body:
+        if (isinstance(node, ast.Assign)
+                and any(isinstance(t, ast.Name) and t.id == "alias" for t in node.targets)):
+            try:
+                value = ast.literal_eval(node.value)
+            except (ValueError, TypeError, SyntaxError):
+                return {}
+            if isinstance(value, dict):
+                return {k: v for k, v in value.items() if isinstance(k, str) and isinstance(v, str)}
+    return {}
+
+
+def signature(params: list | None) -> inspect.Signature | None:
+    """Rebuild a ``run()`` signature (defaults are placeholders) from manifest params."""
+    if params is None:
+        return None
+    return inspect.Signature([
+        inspect.Parameter(name, getattr(inspect.Parameter, kind),
+                          default=None if has_default else inspect.Parameter.empty)
+        for name, kind, has_default in params
+    ])
+
+
+class NeuroManifest:
+    def __init__(self, path: str):
+        self.path     = path
+        self.entries  = self._read()
+        self.dirty    = False
+        self.counters = {"hits": 0, "misses": 0}
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def entry(self, conf: pathlib.Path) -> dict:
+        """Manifest entry for one conf.json (cached or rebuilt); raises on bad JSON / code."""
+        folder, key = conf.parent, str(conf.resolve())
+        stamp = _stamp(folder)
+        hit = self.entries.get(key)
+        if hit is not None and hit.get("stamp") == stamp:
+            self.counters["hits"] += 1
+            return hit
+
+        conf_src = conf.read_text(encoding="utf-8")
+        spec     = json.loads(conf_src)
+        code_src = (folder / "code.py").read_text(encoding="utf-8")
+        prompt_p = folder / "prompt.txt"
+        prompt   = prompt_p.read_text(encoding="utf-8") if prompt_p.exists() else None
+        tree     = ast.parse(code_src, filename=str(folder / "code.py"))
+        entry = {
+            "stamp":  stamp,
+            "spec":   spec,
+            "prompt": prompt,
+            "digest": hashlib.sha1(
+                "\x1f".join((conf_src, code_src, prompt or "")).encode("utf-8")).hexdigest(),
+            "params": _run_params(tree),
+            "alias":  _alias(tree),
+        }
+        self.entries[key] = entry
+        self.dirty = True
+        self.counters["misses"] += 1
+        return entry
+
+    def forget(self, conf: pathlib.Path):
+        if self.entries.pop(str(conf.resolve()), None) is not None:
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[factory] could not write neuro manifest: {e}")
+            return
+        self.dirty = False
+
+    def stats(self) -> dict:
+        return {**self.counters, "entries": len(self.entries)}
+
+
+manifest = NeuroManifest(
+    os.getenv("NEO_NEURO_MANIFEST", os.path.join(".cache", "neuro_manifest.json")),
+)
@@ -0,0 +1,106 @@
+"""
+Output memoisation for pure neuros.
+
+A neuro whose result depends only on its params and declared inputs can
+opt in through conf.json:
+
+    "pure": true                  # default TTL
+    "pure": {"ttl": 600}          # seconds, 0 = never expires
+
+Key = sha256 of (neuro digest, params, declared inputs read from state).
+The digest hashes conf/code/prompt, so an edited neuro never serves an old
+result; NeuroFactory also drops the neuro's entries on hot reload.  Calls
+whose arguments are not JSON-serialisable are simply not memoised.
+"""
+import copy
+import hashlib
+import json
+import os
+import time
+
+from core.llm_cache import MemoryLRU
+
+
+def policy(spec: dict) -> dict | None:
+    """Normalise the conf.json ``pure`` knob into ``{"ttl": …}`` or None."""
+    raw = spec.get("pure", False)
+    if not raw:
+        return None
+    if raw is True:
+        return {"ttl": None}
+    if isinstance(raw, dict):
+        return {"ttl": raw.get("ttl")}
+    return None
+
+
+class NeuroMemo:
+    def __init__(self, *, max_items: int = 256, default_ttl: float = 3600.0,
+                 enabled: bool = True):
+        self.enabled     = enabled
+        self.max_items   = max_items
+        self.default_ttl = default_ttl
+        self.memory: dict[str, MemoryLRU] = {}        # neuro → its own LRU
+        self.counters: dict[str, dict] = {}
+
+    def _count(self, name: str, what: str):
+        c = self.counters.setdefault(name, {"hits": 0, "misses": 0, "skipped": 0,
+                                            "invalidations": 0})
+        c[what] += 1
+
+    @staticmethod
+    def key(digest: str, inputs, state: dict, params: dict) -> str | None:
+        names = inputs if isinstance(inputs, list) else list(inputs or [])
+        seen  = {k: state[k] for k in names if k in state and k not in params}
+        try:
+            blob = json.dumps({"d": digest, "p": params, "s": seen},
+                              sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    # ---------- lookup / store -------------------------------------------
+    def get(self, name: str, key: str | None):
+        if not self.enabled:
+            return None
+        if key is None:
+            self._count(name, "skipped")
+            return None
+        lru   = self.memory.get(name)
+        value = lru.get(key) if lru is not None else None
+        if value is None:
+            self._count(name, "misses")
+            return None
+        self._count(name, "hits")
+        return copy.deepcopy(value)
+
+    def put(self, name: str, key: str | None, value, ttl: float | None = None):
+        if not self.enabled or key is None or not isinstance(value, dict):
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+        lru = self.memory.setdefault(name, MemoryLRU(self.max_items))
+        lru.put(key, copy.deepcopy(value), time.time() + ttl if ttl else 0.0)
+
+    def invalidate(self, name: str):
+        lru = self.memory.pop(name, None)
+        if lru is not None and len(lru):
+            self._count(name, "invalidations")
+
+    def stats(self) -> dict:
+        hits   = sum(c["hits"] for c in self.counters.values())
+        misses = sum(c["misses"] for c in self.counters.values())
+        return {
+            "hits":     hits,
+            "misses":   misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "items":    sum(len(m) for m in self.memory.values()),
+            "enabled":  self.enabled,
+            "neuros":   {n: {**c, "items": len(self.memory.get(n) or ())}
+                         for n, c in self.counters.items()},
+        }
+
+
+memo = NeuroMemo(
+    max_items=int(os.getenv("NEO_NEURO_MEMO_ITEMS", "256")),
+    default_ttl=float(os.getenv("NEO_NEURO_MEMO_TTL", "3600")),
+    enabled=os.getenv("NEO_NEURO_MEMO", "on").lower() not in ("0", "off", "false", "no"),
+)
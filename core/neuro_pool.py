@@ -0,0 +1,202 @@
+"""
+Off-loop execution for blocking neuros.
+
+conf.json picks where ``run`` executes:
+
+    "executor": "loop"       # default – awaited on the server's event loop
+    "executor": "thread"     # shared bounded thread pool (NEO_NEURO_THREADS)
+    "executor": "process"    # warm worker processes (NEO_NEURO_PROCESSES)
+
+Thread mode: every pool thread keeps its own event loop, so a neuro's
+``async def run`` can block freely (pip, TTS, file I/O) while the server
+loop keeps serving other conversations.  The state dict is shared as-is,
+stdout / stderr capture follows the ContextVar into the thread, and LLM
+calls made through ``state["__llm"]`` hop back to the server loop (see
+BaseBrain), so the pooled client, rate limiter and cache still apply.  Cancelling the
+node cancels the coroutine on the worker loop.
+
+Process mode is for CPU-bound work.  The neuro's code is compiled once per
+worker and digest; the picklable part of the state goes in, the result,
+captured output and any state keys the neuro changed (compared by value,
+so in-place edits count) come back.  The workers start on the first
+process dispatch, not when the neuro is registered.  LLM calls
+in a worker use that worker's own client and limiter, and a call that is
+already running cannot be interrupted – only abandoned.
+"""
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import pickle
+import textwrap
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from core import context, logcapture
+
+# runtime objects that never cross a process boundary
+_LOCAL = {"__factory", "__conv", "__llm"}
+
+_tls = threading.local()
+
+
+def _thread_loop() -> asyncio.AbstractEventLoop:
+    loop = getattr(_tls, "loop", None)
+    if loop is None:
+        loop = _tls.loop = asyncio.new_event_loop()
+    return loop
+
+
+def _thread_run(fn, state, kw, box):
+    loop = _thread_loop()
+    task = loop.create_task(fn(state, **kw))
+    box["cancel"] = lambda: loop.call_soon_threadsafe(task.cancel)
+    t0 = time.thread_time()
+    try:
+        return loop.run_until_complete(task)
+    finally:
+        box["cpu"] = time.thread_time() - t0
+
+
+# ---------- process workers -------------------------------------------------
+_mods: dict[str, types.ModuleType] = {}
+
+
+def _warm():
+    # import the heavy bits once per worker, not on the first real call
+    import core.base_brain  # noqa: F401
+
+
+def _snapshot(v) -> bytes | None:
+    try:
+        return pickle.dumps(v)
+    except Exception:
+        return None
+
+
+def _proc_run(name, digest, code_src, llm, prompt, state, kw, remaining):
+    from core.base_brain import get_brain
+
+    mod = _mods.get(digest)
+    if mod is None:
+        mod = types.ModuleType(f"neuro_{name}")
+        exec(compile(textwrap.dedent(code_src), mod.__name__, "exec"), mod.__dict__, mod.__dict__)
+        _mods[digest] = mod
+
+    before = {k: _snapshot(v) for k, v in state.items()}
+    state["__llm"], state["__prompt"] = get_brain(*llm), prompt
+    loop = _thread_loop()
+
+    async def call():
+        deadline = loop.time() + remaining if remaining is not None else None
+        with context.scope(neuro=name, deadline=deadline):
+            return await mod.run(state, **kw)
+
+    t0 = time.process_time()
+    with logcapture.capture() as buf:            # stdout + stderr, capped
+        res = loop.run_until_complete(call())
+    # by value: the state arrived unpickled, so "is" would miss in-place edits
+    writes = {k: v for k, v in state.items()
+              if k not in _LOCAL and k != "__prompt"
+              and (k not in before or before[k] is None or _snapshot(v) != before[k])}
+    return res, buf.getvalue(), writes, time.process_time() - t0
+
+
+def _add_cpu(secs: float):
+    # worker CPU counts towards the node when it is being profiled (core.profiler)
+    perf = context.get("perf")
+    if perf is not None:
+        perf["cpu"] += secs
+
+
+def _picklable(v) -> bool:
+    try:
+        pickle.dumps(v)
+    except Exception:
+        return False
+    return True
+
+
+class NeuroPools:
+    def __init__(self, threads: int = 8, processes: int = 2):
+        self.size     = {"thread": threads, "process": processes}
+        self._threads = None
+        self._procs   = None
+        self.counters = {"thread": 0, "process": 0, "in_flight": 0}
+
+    @property
+    def threads(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(self.size["thread"], thread_name_prefix="neuro")
+        return self._threads
+
+    @property
+    def procs(self) -> ProcessPoolExecutor:
+        if self._procs is None:
+            # spawn, not fork: the server process runs threads and an event loop
+            self._procs = ProcessPoolExecutor(self.size["process"], initializer=_warm,
+                                              mp_context=multiprocessing.get_context("spawn"))
+        return self._procs
+
+    def warm(self):
+        """Start every worker process (the first process dispatch does this)."""
+        if self._procs is not None:
+            return
+        for _ in range(self.size["process"]):
+            self.procs.submit(int)
+
+    # ---------- dispatch --------------------------------------------------
+    async def thread(self, fn, state: dict, kw: dict):
+        loop, box = asyncio.get_running_loop(), {}
+        # LLM calls from the worker loop come back here (BaseBrain checks "loop")
+        with context.scope(loop=loop):
+            ctx = contextvars.copy_context()
+        fut = loop.run_in_executor(self.threads, ctx.run, _thread_run, fn, state, kw, box)
+        self.counters["thread"] += 1
+        self.counters["in_flight"] += 1
+        try:
+            return await fut
+        except asyncio.CancelledError:
+            if "cancel" in box:
+                box["cancel"]()
+            raise
+        finally:
+            self.counters["in_flight"] -= 1
+            _add_cpu(box.get("cpu", 0.0))
+
+    async def process(self, name: str, digest: str, code_src: str, llm: tuple,
+                      prompt: str | None, state: dict, kw: dict):
+        self.warm()
+        args = {k: v for k, v in state.items() if k not in _LOCAL and _picklable(v)}
+        fut  = asyncio.get_running_loop().run_in_executor(
+            self.procs, _proc_run, name, digest, code_src, llm, prompt, args, kw,
+            context.remaining())
+        self.counters["process"] += 1
+        self.counters["in_flight"] += 1
+        try:
+            res, logs, writes, cpu = await fut
+        finally:
+            self.counters["in_flight"] -= 1
+        _add_cpu(cpu)
+        if logs:
+            print(logs, end="")                 # into the caller's capture buffer
+        state.update(writes)
+        return res
+
+    def shutdown(self):
+        for pool in (self._threads, self._procs):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = self._procs = None
+
+    def stats(self) -> dict:
+        return {**self.counters, "threads": self.size["thread"],
+                "processes": self.size["process"]}
+
+
+pools = NeuroPools(
+    threads=int(os.getenv("NEO_NEURO_THREADS", "8")),
+    processes=int(os.getenv("NEO_NEURO_PROCESSES", "2")),
+)
@@ -0,0 +1,185 @@
+"""
+Plan cache – skip the planner LLM call for goals we have planned before.
+
+Key = (normalised goal template, profile, catalogue fingerprint).
+
+The goal is normalised by lower-casing and squeezing whitespace, and
+literal arguments – quoted strings, URLs, paths, file names, numbers –
+are lifted out into *slots*:
+
+    'open "~/code/neo" in vscode'   →  'open <0> in vscode'   ["~/code/neo"]
+
+so the same command with different arguments shares one entry.  Before a
+flow is stored, the slot values (and the full goal text) inside its params
+are replaced by ``{{slot:N}}`` / ``{{slot:goal}}`` markers – numeric params
+equal to a slot become ``{{slot:N:int}}`` / ``{{slot:N:float}}`` – and a hit
+fills in the new values.  A slot the flow used without a marker (a short
+value buried in a longer string) can't be swapped, so a hit whose value
+for it differs is refused.
+
+Goals that only make sense in context ("yes", "do it again", "fix that")
+are never cached: the key has no conversation history, so a template with
+fewer than ``NEO_PLAN_CACHE_MIN_WORDS`` words (default 3) or with a word
+pointing back into the conversation gets no key at all.
+
+The catalogue fingerprint hashes the code/conf/prompt of every visible
+neuro, so reloading a neuro changes the key and stale plans are never
+served.  Brain stores a plan only after its run finished without a
+replan, and evicts a cached plan whose run needed one.
+"""
+import copy
+import hashlib
+import os
+import re
+import time
+
+from core.llm_cache import MemoryLRU
+
+_SLOT = re.compile(
+    r'"[^"]+"'                              # "double quoted"
+    r"|'[^']+'"                             # 'single quoted'
+    r"|https?://\S+"                        # URLs
+    r"|~?[\w.\-]*/[\w.\-/]+"                # paths
+    r"|\b[\w\-]+\.[A-Za-z0-9]{1,5}\b"       # file names
+    r"|\b\d+(?:\.\d+)?\b"                   # numbers
+)
+
+
+def normalize(goal: str) -> tuple[str, list[str]]:
+    slots: list[str] = []
+
+    def lift(m):
+        slots.append(m.group(0).strip("\"'"))
+        return f"<{len(slots) - 1}>"
+
+    text = " ".join(goal.split())
+    return _SLOT.sub(lift, text).lower().rstrip(" .!?"), slots
+
+
+# words that refer back into the conversation – the goal alone can't be planned
+_CONTEXTUAL = {"it", "its", "that", "this", "these", "those", "them", "they", "again",
+               "same", "above", "previous", "last", "yes", "no", "ok", "okay", "sure",
+               "continue", "more", "instead"}
+
+_MARKER = re.compile(r"\{\{slot:(\d+)(?::(int|float))?\}\}")
+
+
+def contextual(template: str, min_words: int = 3) -> bool:
+    words = re.findall(r"<\d+>|[a-z']+", template)
+    return len(words) < min_words or any(w in _CONTEXTUAL for w in words)
+
+
+def _walk(obj, fn):
+    if isinstance(obj, dict):
+        return {k: _walk(v, fn) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_walk(v, fn) for v in obj]
+    if isinstance(obj, bool) or obj is None:
+        return obj
+    return fn(obj) if isinstance(obj, (str, int, float)) else obj
+
+
+def _number(text: str):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+class PlanCache:
+    def __init__(self, *, max_items: int = 256, ttl: float = 86400.0, enabled: bool = True,
+                 min_words: int = 3):
+        self.enabled   = enabled
+        self.ttl       = ttl
+        self.min_words = min_words
+        self.memory    = MemoryLRU(max_items)
+        self.counters  = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0,
+                          "contextual": 0, "refused": 0}
+
+    def key(self, goal: str, profile: str, fingerprint: str) -> str | None:
+        """Cache key for *goal*, or None when the goal depends on the conversation."""
+        template, _ = normalize(goal)
+        if contextual(template, self.min_words):
+            self.counters["contextual"] += 1
+            return None
+        blob = "\x1f".join((template, profile, fingerprint))
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    # ---------- lookup / store -------------------------------------------
+    def get(self, key: str, goal: str) -> dict | None:
+        """The cached flow with this goal's slot values filled in, or None."""
+        entry = self.memory.get(key) if self.enabled else None
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        _, slots = normalize(goal)
+        if any(slots[i] != v for i, v in entry["fixed"].items()):
+            # the flow has an old value baked in where we couldn't put a marker
+            self.counters["refused"] += 1
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+
+        def fill(s):
+            if not isinstance(s, str):
+                return s
+            whole = _MARKER.fullmatch(s)
+            if whole and whole.group(2):
+                value = slots[int(whole.group(1))]
+                try:
+                    return int(value) if whole.group(2) == "int" else float(value)
+                except ValueError:
+                    return value
+            s = s.replace("{{slot:goal}}", goal)
+            return _MARKER.sub(lambda m: slots[int(m.group(1))], s)
+
+        return _walk(copy.deepcopy(entry["flow"]), fill)
+
+    def put(self, key: str, goal: str, flow: dict):
+        if not self.enabled:
+            return
+        _, slots = normalize(goal)
+        placed = set()
+
+        def abstract(s):
+            if not isinstance(s, str):
+                for i, v in enumerate(slots):
+                    if _number(v) is not None and _number(v) == s:
+                        placed.add(i)
+                        return f"{{{{slot:{i}:{'int' if isinstance(s, int) else 'float'}}}}}"
+                return s
+            if s == goal:
+                placed.update(range(len(slots)))
+                return "{{slot:goal}}"
+            for i, v in enumerate(slots):
+                # exact match always; substrings only for values long enough
+                # not to collide with unrelated text ("1", "a.b")
+                if s == v or (len(v) >= 4 and v in s):
+                    s = s.replace(v, f"{{{{slot:{i}}}}}")
+                    placed.add(i)
+            return s
+
+        entry = {"flow": _walk(flow, abstract)}
+        # slots the flow never received as a marker only match their old value
+        entry["fixed"] = {i: v for i, v in enumerate(slots) if i not in placed}
+        self.memory.put(key, entry, time.time() + self.ttl if self.ttl else 0.0)
+        self.counters["stores"] += 1
+
+    def evict(self, key: str):
+        self.memory.pop(key)
+        self.counters["evictions"] += 1
+
+    def stats(self) -> dict:
+        total = self.counters["hits"] + self.counters["misses"]
+        return {**self.counters,
+                "hit_rate": round(self.counters["hits"] / total, 4) if total else 0.0,
+                "items":    len(self.memory),
+                "enabled":  self.enabled}
+
+
+plan_cache = PlanCache(
+    max_items=int(os.getenv("NEO_PLAN_CACHE_ITEMS", "256")),
+    ttl=float(os.getenv("NEO_PLAN_CACHE_TTL", "86400")),
+    enabled=os.getenv("NEO_PLAN_CACHE", "on").lower() not in ("0", "off", "false", "no"),
+    min_words=int(os.getenv("NEO_PLAN_CACHE_MIN_WORDS", "3")),
+)
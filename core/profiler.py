@@ -0,0 +1,149 @@
+"""
+Per-node profiling – wall time, CPU time and allocations per neuro.
+
+Off by default; ``/profile perf on`` turns it on for one conversation.
+Every neuro run in that conversation then produces a sample
+
+    {cid, node, neuro, wall_ms, cpu_ms, alloc_peak_kb, alloc_net_kb, error}
+
+published as a ``node.metrics`` hub event (``kind: "node"``) and kept in
+a rolling per-neuro window (``NEO_PERF_WINDOW`` runs) for ``/profile perf
+stats`` and ``GET /metrics``.
+
+``cpu_ms`` is the CPU the node's own coroutine used on the event loop –
+measured around each of its steps, so concurrent nodes are not counted –
+plus the CPU of its worker thread or process (``"executor"`` modes).
+Allocations come from tracemalloc, which runs only while at least one
+conversation profiles.  Its peak is process-wide, so with several nodes
+running at once the peak is an upper bound.
+"""
+import os
+import time
+import tracemalloc
+from collections import deque
+
+from core import context
+
+
+class _Timed:
+    """Await *coro*, adding up the thread CPU time spent inside its steps."""
+    def __init__(self, coro):
+        self.coro = coro
+        self.cpu  = 0.0
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            t0 = time.thread_time()
+            try:
+                step = self.coro.throw(error) if error is not None else self.coro.send(value)
+            except StopIteration as stop:
+                self.cpu += time.thread_time() - t0
+                return stop.value
+            except BaseException:
+                self.cpu += time.thread_time() - t0
+                raise
+            self.cpu += time.thread_time() - t0
+            try:
+                value, error = (yield step), None
+            except BaseException as e:           # cancellation etc. – pass it on
+                value, error = None, e
+
+
+def _window_stats(values) -> dict:
+    if not values:
+        return {}
+    s = sorted(values)
+    return {"mean": round(sum(s) / len(s), 1), "p50": round(s[len(s) // 2], 1),
+            "p95": round(s[min(len(s) - 1, int(len(s) * 0.95))], 1), "max": round(s[-1], 1)}
+
+
+class NodeProfiler:
+    def __init__(self, window: int = 200):
+        self.window = window
+        self.conversations: set[str] = set()
+        self.samples: dict[str, deque] = {}      # neuro → last *window* samples
+
+    # ---------- switch --------------------------------------------------
+    def enable(self, cid: str, on: bool = True):
+        if on:
+            self.conversations.add(cid)
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        else:
+            self.conversations.discard(cid)
+            if not self.conversations and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    def enabled(self, cid: str | None) -> bool:
+        return cid in self.conversations
+
+    # ---------- measuring -----------------------------------------------
+    async def run(self, neuro: str, coro):
+        """Await *coro* (one neuro run), measuring it when its conversation profiles."""
+        cid = context.get("cid")
+        if not self.enabled(cid):
+            return await coro
+        perf  = {"cpu": 0.0}                    # worker thread / process CPU adds here
+        timed = _Timed(coro)
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        t0, error = time.perf_counter(), None
+        try:
+            with context.scope(perf=perf):
+                return await timed
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            wall = time.perf_counter() - t0
+            cur, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+            sample = {
+                "cid":           cid,
+                "node":          context.get("node"),
+                "neuro":         neuro,
+                "wall_ms":       round(wall * 1000, 1),
+                "cpu_ms":        round((timed.cpu + perf["cpu"]) * 1000, 1),
+                "alloc_peak_kb": round(max(peak - base, 0) / 1024, 1) if tracing else None,
+                "alloc_net_kb":  round((cur - base) / 1024, 1) if tracing else None,
+                "error":         error,
+            }
+            self.samples.setdefault(neuro, deque(maxlen=self.window)).append(sample)
+            pub = context.get("pub")
+            if pub:
+                await pub("node.metrics", {"id": sample["node"], "kind": "node", **sample})
+
+    # ---------- reporting -----------------------------------------------
+    def stats(self) -> dict:
+        out = {}
+        for neuro, rows in self.samples.items():
+            out[neuro] = {
+                "runs":          len(rows),
+                "errors":        sum(1 for r in rows if r["error"]),
+                "wall_ms":       _window_stats([r["wall_ms"] for r in rows]),
+                "cpu_ms":        _window_stats([r["cpu_ms"] for r in rows]),
+                "alloc_peak_kb": _window_stats([r["alloc_peak_kb"] for r in rows
+                                                if r["alloc_peak_kb"] is not None]),
+                "alloc_net_kb":  _window_stats([r["alloc_net_kb"] for r in rows
+                                                if r["alloc_net_kb"] is not None]),
+            }
+        return {"conversations": len(self.conversations), "neuros": out}
+
+    def table(self) -> str:
+        """Markdown table for ``/profile perf stats``."""
+        rows = self.stats()["neuros"]
+        if not rows:
+            return "no node samples yet – run something with `/profile perf on`."
+        lines = ["| neuro | runs | wall p50 / p95 ms | cpu p50 / p95 ms | peak KB (max) | net KB (mean) |",
+                 "|---|---|---|---|---|---|"]
+        for neuro, r in sorted(rows.items(), key=lambda kv: -kv[1]["wall_ms"].get("p95", 0)):
+            w, c = r["wall_ms"], r["cpu_ms"]
+            lines.append(f"| {neuro} | {r['runs']} | {w.get('p50')} / {w.get('p95')} | "
+                         f"{c.get('p50')} / {c.get('p95')} | {r['alloc_peak_kb'].get('max', '–')} | "
+                         f"{r['alloc_net_kb'].get('mean', '–')} |")
+        return "\n".join(lines)
+
+
+profiler = NodeProfiler(window=int(os.getenv("NEO_PERF_WINDOW", "200")))
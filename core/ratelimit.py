@@ -0,0 +1,200 @@
+"""
+Client-side flow control for LLM calls.
+
+Per model:
+  * a bounded-concurrency semaphore
+  * token buckets for requests/min and tokens/min
+  * retry with jittered exponential backoff on 429 / 5xx / connection
+    errors, honouring ``Retry-After`` (and ``retry-after-ms``)
+
+so a burst queues for a moment instead of failing the neuro and kicking
+off a replan (= yet another LLM call).  The OpenAI SDK's own retries are
+switched off for the async client; this is the only retry loop.
+
+Limits come from the environment; ``0`` means unlimited:
+
+    NEO_LLM_CONCURRENCY=16  NEO_LLM_RPM=0  NEO_LLM_TPM=0
+    NEO_LLM_LIMITS='{"gpt-4o": {"rpm": 500, "tpm": 30000, "concurrency": 8}}'
+    NEO_LLM_MAX_RETRIES=4   NEO_LLM_RETRY_BASE=0.5  NEO_LLM_RETRY_MAX_DELAY=60
+"""
+import asyncio
+import contextlib
+import json
+import os
+import random
+import time
+
+from openai import APIConnectionError, APIStatusError, RateLimitError
+
+from core import context
+from core.metrics import Histogram
+
+_RETRY_STATUS = {408, 409, 429}
+
+
+class TokenBucket:
+    """``rate`` units per minute, bursting up to ``capacity``."""
+    def __init__(self, per_minute: float, capacity: float | None = None):
+        self.rate     = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level    = self.capacity
+        self.stamp    = time.monotonic()
+        self._lock    = asyncio.Lock()          # FIFO – no barging past waiters
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    async def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)    # a huge prompt must still get through
+        async with self._lock:
+            self._refill()
+            while self.level < amount:
+                await asyncio.sleep((amount - self.level) / self.rate)
+                self._refill()
+            self.level -= amount
+
+    def settle(self, delta: float):
+        """Charge (or refund) the difference between estimate and actual usage."""
+        self._refill()
+        self.level = min(self.capacity, self.level - delta)
+
+
+class ModelLimiter:
+    def __init__(self, *, concurrency: int = 0, rpm: float = 0, tpm: float = 0):
+        self.sem = asyncio.Semaphore(concurrency) if concurrency else None
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.limits  = {"concurrency": concurrency, "rpm": rpm, "tpm": tpm}
+        self.waiting = self.in_flight = self.max_waiting = 0
+        self.counters = {"requests": 0, "retries": 0, "throttled": 0, "gave_up": 0}
+        self.wait = Histogram()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, est_tokens: int = 0):
+        t0 = time.perf_counter()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        acquired = False
+        try:
+            if self.sem:
+                await self.sem.acquire()
+                acquired = True
+            if self.rpm:
+                await self.rpm.acquire(1)
+            if self.tpm and est_tokens:
+                await self.tpm.acquire(est_tokens)
+        except BaseException:
+            if acquired:
+                self.sem.release()
+            raise
+        finally:
+            self.waiting -= 1
+        self.wait.add((time.perf_counter() - t0) * 1000)
+        self.in_flight += 1
+        self.counters["requests"] += 1
+        try:
+            yield self
+        finally:
+            self.in_flight -= 1
+            if self.sem:
+                self.sem.release()
+
+    def settle(self, est_tokens: int, usage):
+        actual = getattr(usage, "total_tokens", None)
+        if self.tpm and actual is not None:
+            self.tpm.settle(actual - est_tokens)
+
+    def stats(self) -> dict:
+        return {
+            **self.limits, **self.counters,
+            "waiting":     self.waiting,
+            "in_flight":   self.in_flight,
+            "max_waiting": self.max_waiting,
+            "wait_ms":     self.wait.stats(),
+        }
+
+
+def _retry_after(err) -> float | None:
+    headers = getattr(getattr(err, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):           # HTTP-date form – use our backoff
+        pass
+    return None
+
+
+def _retryable(err) -> bool:
+    if isinstance(err, (RateLimitError, APIConnectionError)):
+        return True
+    if isinstance(err, APIStatusError):
+        status = getattr(err, "status_code", 0)
+        return status in _RETRY_STATUS or status >= 500
+    return False
+
+
+class RateLimiter:
+    def __init__(self, *, concurrency: int = 16, rpm: float = 0, tpm: float = 0,
+                 overrides: dict | None = None, max_retries: int = 4,
+                 base_delay: float = 0.5, max_delay: float = 60.0):
+        self.defaults    = {"concurrency": concurrency, "rpm": rpm, "tpm": tpm}
+        self.overrides   = overrides or {}
+        self.max_retries = max_retries
+        self.base_delay  = base_delay
+        self.max_delay   = max_delay
+        self._models: dict[str, ModelLimiter] = {}
+
+    def model(self, name: str) -> ModelLimiter:
+        if name not in self._models:
+            self._models[name] = ModelLimiter(**{**self.defaults, **self.overrides.get(name, {})})
+        return self._models[name]
+
+    def backoff(self, attempt: int, err=None) -> float:
+        hinted = _retry_after(err) if err is not None else None
+        if hinted is not None:
+            return min(hinted, self.max_delay)
+        # "full jitter": uniform over [0, base·2^attempt]
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def retry(self, model: str, fn, info: dict | None = None):
+        """Await ``fn()`` until it succeeds, fails for good, or retries run out."""
+        lim = self.model(model)
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await fn()
+            except Exception as e:
+                if not _retryable(e) or attempt == self.max_retries:
+                    if _retryable(e):
+                        lim.counters["gave_up"] += 1
+                    raise
+                delay = self.backoff(attempt, e)
+                left  = context.remaining()
+                if left is not None and delay >= left:
+                    # the turn's deadline would pass while we sleep – give up now
+                    lim.counters["gave_up"] += 1
+                    raise
+                lim.counters["retries"] += 1
+                if isinstance(e, RateLimitError):
+                    lim.counters["throttled"] += 1
+                if info is not None:
+                    info["retries"] = info.get("retries", 0) + 1
+                print(f"[LLM] {model}: {type(e).__name__}, retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {name: lim.stats() for name, lim in self._models.items()}
+
+
+limiter = RateLimiter(
+    concurrency=int(os.getenv("NEO_LLM_CONCURRENCY", "16")),
+    rpm=float(os.getenv("NEO_LLM_RPM", "0")),
+    tpm=float(os.getenv("NEO_LLM_TPM", "0")),
+    overrides=json.loads(os.getenv("NEO_LLM_LIMITS", "") or "{}"),
+    max_retries=int(os.getenv("NEO_LLM_MAX_RETRIES", "4")),
+    base_delay=float(os.getenv("NEO_LLM_RETRY_BASE", "0.5")),
+    max_delay=float(os.getenv("NEO_LLM_RETRY_MAX_DELAY", "60")),
+)
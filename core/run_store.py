@@ -0,0 +1,168 @@
+"""
+Durable executor progress – flows survive a server restart / hot reload.
+
+One JSON file per running task under ``NEO_RUN_STORE`` (default
+``.cache/runs``), rewritten atomically at every node boundary:
+
+    {"id", "cid", "profile", "flow", "state", "checkpoints", "running", "ts"}
+
+``state`` keeps only the JSON-serialisable keys (runtime objects such as
+``__factory`` / ``__conv`` are rebuilt on resume) and ``checkpoints`` are
+the executor's node checkpoints, so a resumed flow restores finished nodes
+and runs the rest.  The file is deleted when the task finishes, times out
+or is superseded; whatever is left on startup was interrupted.
+
+A save encodes every value once, straight into the record (strings and
+checkpoints are encoded once per run and reused, keys that can't be
+stored are remembered), and hands the text to one writer thread.  Only
+the newest record of a run is written, so a burst of node boundaries
+costs one file write and the event loop never waits for the disk.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+
+# runtime objects Brain re-creates – never written to disk
+_RUNTIME = {"__factory", "__conv", "__history", "__llm", "__prompt"}
+
+# values that can't change under the same identity – their encoding is reused
+_IMMUTABLE = (str, int, float, bool, type(None))
+
+_DROP = object()
+
+
+def _dumps(v) -> str | None:
+    try:
+        return json.dumps(v, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+
+
+def _encode(cache: dict, key, v, *, frozen: bool = False) -> str | None:
+    """JSON for *v*, reusing the last encoding of *key* while it still applies."""
+    hit = cache.get(key)
+    # a non-serialisable value stays that way – don't try it on every save
+    if hit is not None and hit[0] is v and (frozen or hit[1] is None or isinstance(v, _IMMUTABLE)):
+        return hit[1]
+    enc = _dumps(v)
+    cache[key] = (v, enc)
+    return enc
+
+
+class RunStore:
+    def __init__(self, path: str, enabled: bool = True):
+        self.path     = path
+        self.enabled  = enabled
+        self.counters = {"saves": 0, "writes": 0, "resumed": 0, "abandoned": 0}
+        self._enc: dict[str, dict] = {}          # run id → encoding caches
+        self._queue: dict[str, object] = {}      # run id → newest record text / _DROP
+        self._cond   = threading.Condition()
+        self._busy   = False
+        self._writer = None
+
+    def _fp(self, run_id: str) -> str:
+        return os.path.join(self.path, f"{run_id}.json")
+
+    # ---------- write -----------------------------------------------------
+    def save(self, run_id: str, *, cid, profile, flow, state, checkpoints, running):
+        if not self.enabled or not run_id:
+            return
+        enc = self._enc.setdefault(run_id, {"state": {}, "ckpt": {}, "flow": {}})
+        fields = [
+            f'"{k}":' + json.dumps(v, ensure_ascii=False)
+            for k, v in (("id", run_id), ("cid", cid), ("profile", profile),
+                         ("running", sorted(running)), ("ts", time.time()))
+        ]
+        fields.append('"flow":' + (_encode(enc["flow"], 0, flow, frozen=True) or "null"))
+        values = ((k, _encode(enc["state"], k, v)) for k, v in state.items() if k not in _RUNTIME)
+        fields.append('"state":{' + ",".join(
+            f"{json.dumps(k, ensure_ascii=False)}:{e}" for k, e in values if e is not None) + "}")
+        # a checkpoint is a snapshot – encoded when first seen; one that can't
+        # be stored just means that node re-runs
+        ckpts = ((sig, _encode(enc["ckpt"], sig, pair, frozen=True))
+                 for sig, pair in checkpoints.items())
+        fields.append('"checkpoints":{' + ",".join(
+            f"{json.dumps(sig)}:{e}" for sig, e in ckpts if e is not None) + "}")
+        self.counters["saves"] += 1
+        self._submit(run_id, "{" + ",".join(fields) + "}")
+
+    def drop(self, run_id: str | None):
+        if run_id:
+            self._enc.pop(run_id, None)
+            self._submit(run_id, _DROP)
+
+    # ---------- writer thread ---------------------------------------------
+    def _submit(self, run_id: str, item):
+        with self._cond:
+            self._queue.pop(run_id, None)        # keep queue order = last touched
+            self._queue[run_id] = item
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._drain, name="run-store",
+                                                daemon=True)
+                self._writer.start()
+                # a daemon thread dies with the interpreter – finish the queue first
+                atexit.register(self.flush, 5.0)
+            self._cond.notify_all()
+
+    def _drain(self):
+        while True:
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+                while not self._queue:
+                    self._cond.wait()
+                run_id = next(iter(self._queue))
+                item   = self._queue.pop(run_id)
+                self._busy = True
+            try:
+                if item is _DROP:
+                    try:
+                        os.remove(self._fp(run_id))
+                    except FileNotFoundError:
+                        pass
+                else:
+                    os.makedirs(self.path, exist_ok=True)
+                    tmp = self._fp(run_id) + ".tmp"
+                    with open(tmp, "w", encoding="utf-8") as f:
+                        f.write(item)
+                    os.replace(tmp, self._fp(run_id))
+                    self.counters["writes"] += 1
+            except OSError as e:
+                print(f"[runs] could not write {run_id}: {e}")
+
+    def flush(self, timeout: float | None = None):
+        """Block until every queued save / drop has hit the disk."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    # ---------- read ------------------------------------------------------
+    def pending(self) -> list[dict]:
+        """Every run left behind by the previous process, oldest first."""
+        self.flush()
+        if not self.enabled or not os.path.isdir(self.path):
+            return []
+        out = []
+        for name in os.listdir(self.path):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.path, name), encoding="utf-8") as f:
+                    rec = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            rec["checkpoints"] = {s: tuple(v) for s, v in rec.get("checkpoints", {}).items()}
+            out.append(rec)
+        return sorted(out, key=lambda r: r.get("ts", 0))
+
+    def stats(self) -> dict:
+        return {**self.counters, "enabled": self.enabled,
+                "pending": len([n for n in os.listdir(self.path) if n.endswith(".json")])
+                           if os.path.isdir(self.path) else 0}
+
+
+runs = RunStore(
+    path=os.getenv("NEO_RUN_STORE", os.path.join(".cache", "runs")),
+    enabled=os.getenv("NEO_RUN_RESUME", "on").lower() not in ("0", "off", "false", "no"),
+)
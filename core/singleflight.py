@@ -0,0 +1,70 @@
+"""
+Single-flight coalescing for identical in-flight requests.
+
+The first caller for a key (the *leader*) starts the work in its own task;
+everyone who asks for the same key while it is running just awaits that
+task and receives the same result – or the same exception.
+
+Cancellation is per waiter: a waiter that gets cancelled only stops
+waiting (the work is shielded), and the underlying task is cancelled only
+once *every* waiter has gone away.
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task    = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, enabled: bool = True):
+        self.enabled  = enabled
+        self._calls: dict[str, _Call] = {}
+        self.counters = {"calls": 0, "leaders": 0, "saved": 0, "abandoned": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        self.counters["calls"] += 1
+        if not self.enabled:
+            return await fn()
+
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _t, k=key, c=call: self._forget(k, c))
+            self.counters["leaders"] += 1
+        else:
+            self.counters["saved"] += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # every interested caller was cancelled – stop the work too
+                call.task.cancel()
+                self.counters["abandoned"] += 1
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled():
+            call.task.exception()        # mark retrieved – avoids asyncio warnings
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> dict:
+        return {**self.counters, "in_flight": self.in_flight(), "enabled": self.enabled}
+
+
+flights = SingleFlight(
+    enabled=os.getenv("NEO_LLM_SINGLEFLIGHT", "on").lower() not in ("0", "off", "false", "no")
+)
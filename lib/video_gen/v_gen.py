@@ -51,7 +51,16 @@ load_dotenv(dotenv_path=env_path)
 print("→ Loading .env from", env_path)
 print("→ OPENAI_API_KEY is", os.getenv("OPENAI_API_KEY"))
 
-client = OpenAI()  # Reads API key from environment
+# NEO_LLM_CASSETTE_MODE=record|replay swaps the network for a cassette file
+try:
+    from core.cassette import cassette
+except ImportError:          # run standalone, outside the Neo tree
+    cassette = None
+
+if cassette is not None and cassette.enabled:
+    client = cassette.wrap(OpenAI, is_async=False)
+else:
+    client = OpenAI()  # Reads API key from environment
 
 
 def _uuid_fname(ext: str) -> str:
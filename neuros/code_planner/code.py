@@ -147,7 +147,7 @@ async def run(state, *, goal: str = None, catalogue: list = None, intent: str =
         "payload": json.dumps({"goal": goal, "neuros": catalogue}, ensure_ascii=False)
     }
 
-    raw = await llm.plan(query)
+    raw = await llm.aplan(query)
 
     # ── 0. NORMALISE model output so we *always* end up with {ok,flow,…} ──
     if (
@@ -1,11 +1,7 @@
 async def run(state, *, text=None):
     llm    = state["__llm"]
     system = state.get("__prompt", "")
-    conv   = state.get("__conv")
-    if conv:
-        hist = "\n".join(f"{e['sender']}: {e['text']}" for e in conv.history())
-    else:
-        hist = state.get("__history", "")
+    hist   = state.get("__history", "")
     neuros_md = state.get("__neuros_md", "")
     prompt = "\n\n".join([
         system,
@@ -14,5 +10,5 @@ async def run(state, *, text=None):
         f"user: {text}",
         "assistant:"
     ]).strip()
-    answer = llm.generate_text(prompt, "")
+    answer = await llm.agenerate_text(prompt, "", stream=True)
     return {"reply": answer}
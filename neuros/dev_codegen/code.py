@@ -15,7 +15,7 @@ async def run(state, *, text: str = ""):
     # ── 1. NEW neuro ──────────────────────────────────────────────────────
     if not drafts:
         payload = json.dumps({"request": text}, ensure_ascii=False)
-        raw     = llm.generate_json(payload, system_prompt=system)
+        raw     = await llm.agenerate_json(payload, system_prompt=system)
         try:
             files = json.loads(raw)
         except Exception:
@@ -34,7 +34,7 @@ async def run(state, *, text: str = ""):
         "instruction": text,
         "current": drafts
     }, ensure_ascii=False)
-    raw = llm.generate_json(payload, system_prompt=system)
+    raw = await llm.agenerate_json(payload, system_prompt=system)
     try:
         patched = json.loads(raw)
     except Exception:
@@ -10,7 +10,7 @@ async def run(state, *, text=None):
         return {"reply": "No drafts loaded. Use `/load <neuro>` or `dev_new` first."}
 
     payload = {"instruction": text, "drafts": drafts}
-    new_files = json.loads(llm.generate_json(json.dumps(payload), system_prompt=system))
+    new_files = json.loads(await llm.agenerate_json(json.dumps(payload), system_prompt=system))
 
     # Show diff summary
     summary_lines = []
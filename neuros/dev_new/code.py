@@ -31,16 +31,8 @@ async def run(state, *, neuro: str | None = None,
         factory   = state["__factory"]
         neuros_md = state.get("__neuros_md", "")
 
-        # 1️⃣  conversation (last 20 turns for safety)
-        conv_hist = ""
-        conv = state.get("__conv")
-        if conv:
-            conv_hist = "\n".join(
-                f"{e['sender']}: {e['text']}" for e in conv.history()
-            )
-        else:
-            # fall back to whatever snapshot Brain passed in
-            conv_hist = state.get("__history", "")
+        # 1️⃣  conversation – token-budgeted window from the factory
+        conv_hist = state.get("__history", "")
 
         # 2️⃣  emphasise *this* user request
         last_user_turn = (text or "").strip()
@@ -76,7 +68,7 @@ async def run(state, *, neuro: str | None = None,
         # (No inter-prompt diff files – everything lives in one log now)
 
         # ----- call the LLM ----------------------------------------------------
-        raw = llm.generate_json(payload, system_prompt=system)
+        raw = await llm.agenerate_json(payload, system_prompt=system)
 
         # ----- append the model's answer to the same file ----------------------
         with prompt_file.open("a", encoding="utf-8") as f:
@@ -118,14 +110,7 @@ async def run(state, *, neuro: str | None = None,
     neuros_md = state.get("__neuros_md", "")
     
     # Build conversation history
-    conv_hist = ""
-    conv = state.get("__conv")
-    if conv:
-        conv_hist = "\n".join(
-            f"{e['sender']}: {e['text']}" for e in conv.history()
-        )
-    else:
-        conv_hist = state.get("__history", "")
+    conv_hist = state.get("__history", "")
 
     # Create the payload
     payload = json.dumps({
@@ -154,7 +139,7 @@ async def run(state, *, neuro: str | None = None,
     ])
     prompt_file.write_text(full_prompt, encoding="utf-8")
     
-    raw = llm.generate_json(payload, system_prompt=system)
+    raw = await llm.agenerate_json(payload, system_prompt=system)
     
     # ----- append the model's answer to the same file ----------------------
     with prompt_file.open("a", encoding="utf-8") as f:
@@ -19,7 +19,7 @@ async def run(state, *, goal, catalogue, intent=None):
 
     # Ask LLM for a plan
     payload = {"goal": goal, "neuros": catalogue, "history": hist}
-    raw = llm.generate_json(json.dumps(payload, ensure_ascii=False), system_prompt=system)
+    raw = await llm.agenerate_json(json.dumps(payload, ensure_ascii=False), system_prompt=system)
 
     try:
         plan = json.loads(raw)
@@ -3,8 +3,7 @@ import json
 async def run(state, *, text):
     llm = state["__llm"]
     system = state["__prompt"]
-    conv = state.get("__conv")
-    hist = "\n".join(f"{e['sender']}: {e['text']}" for e in conv.history()) if conv else ""
+    hist = state.get("__history", "")
     ctx = state.setdefault("__dev", {})
     drafts = ctx.get("drafts", {})
     neuro = ctx.get("neuro")
@@ -32,7 +31,7 @@ async def run(state, *, text):
             "{\"neuro.json\": \"new content\", \"prompt.txt\": \"new content\", \"code.py\": \"new content\"}"
         )
 
-    updates = json.loads(llm.generate_json(prompt, system))
+    updates = json.loads(await llm.agenerate_json(prompt, system))
     for file, content in updates.items():
         if content:
             drafts[str(Path("neuros") / neuro / file)] = content
@@ -5,7 +5,7 @@ async def run(state, *, library_name):
     # Use the LLM to determine the pip command
     llm = state["__llm"]
     prompt = state["__prompt"]
-    pip_command = await llm.complete(prompt, library_name=library_name)
+    pip_command = await llm.agenerate_text(library_name, prompt)
 
     try:
         # Execute the pip command
@@ -51,7 +51,7 @@ async def run(state, *, goal, catalogue, intent=None):
         encoding="utf-8"
     )
 
-    raw = llm.generate_json(json.dumps(payload, ensure_ascii=False), system)
+    raw = await llm.agenerate_json(json.dumps(payload, ensure_ascii=False), system)
 
     with log_file.open("a", encoding="utf-8") as f:
         f.write("\n\n### LLM OUTPUT ###\n")
@@ -6,15 +6,8 @@ import pathlib
 async def run(state, *, text):
     llm     = state["__llm"]
     system  = state["__prompt"]
-    # if we're running under the Executor, we have a Conversation handle:
-    conv = state.get("__conv")
-    if conv:
-        # rebuild the full chat history
-        entries = conv.history()   # list of {sender, text, ts}
-        hist = "\n".join(f"{e['sender']}: {e['text']}" for e in entries)
-    else:
-        # fallback to whatever snapshot was passed in
-        hist = state.get("__history", "")
+    # token-budgeted window (summary + recent turns) rendered by the factory
+    hist = state.get("__history", "")
     skills  = state.get("__skills_md", "")
 
 
@@ -34,7 +27,7 @@ async def run(state, *, text):
     log_file = log_dir / f"reply_prompt_{ts}.txt"
     log_file.write_text(prompt, encoding="utf-8")
 
-    answer = llm.generate_text(prompt, "")
+    answer = await llm.agenerate_text(prompt, "", stream=True)
 
     with log_file.open("a", encoding="utf-8") as f:
         f.write("\n\n### LLM OUTPUT ###\n")
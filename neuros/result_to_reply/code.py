@@ -13,5 +13,5 @@ async def run(state, *, data=None, goal=None):
         "data": data
     }, ensure_ascii=False)
 
-    reply = llm.generate_text(payload, system_prompt=system)
+    reply = await llm.agenerate_text(payload, system_prompt=system, stream=True)
     return {"reply": reply}
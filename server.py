@@ -4,24 +4,62 @@ import json
 import os
 import logging
 import asyncio
+from contextlib import asynccontextmanager
 from typing import Dict, List, Any, Optional
 
 # FastAPI imports
 from fastapi import FastAPI, WebSocket, BackgroundTasks, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.websockets import WebSocketDisconnect
 
 # Neuro imports
-from core.brain import Brain
+from core.brain import Brain, speculation
+from core.neuro_factory import NeuroFactory
+from core.intent_model import intent_model
+from core.plan_cache import plan_cache
+from core.neuro_memo import memo as neuro_memo
+from core.run_store import runs
+from core.neuro_pool import pools as neuro_pools
+from core.profiler import profiler as node_profiler
+from core import flow_compiler
 from core.pubsub import hub
+from core.history import warm as history_warm
+from core.base_brain import aclose_clients
+from core.llm_cache import cache as llm_cache
+from core.singleflight import flights as llm_flights
+from core.metrics import metrics as llm_metrics
+from core.ratelimit import limiter as llm_limiter
+from core.cassette import cassette as llm_cassette
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # tiktoken may fetch its BPE file on first use – do it off the loop, now
+    await asyncio.to_thread(history_warm, "gpt-4o", "gpt-4o-mini")
+    # pick up tasks a reload / restart interrupted; their events wait in the
+    # hub until the client's WebSocket reconnects
+    for rec in runs.pending():
+        cid = rec.get("cid")
+        if not cid:
+            runs.drop(rec.get("id"))
+            continue
+        await _brain(cid).resume(rec)
+    yield
+    # drop the pooled OpenAI keep-alive connections on shutdown / reload
+    await aclose_clients()
+    logger.info("Closed pooled LLM clients")
+    llm_cache.close()
+    runs.flush()
+    neuro_pools.shutdown()
+    if _factory is not None:
+        _factory.close()
+
 # Create FastAPI app
-app = FastAPI(title="Neuro Server")
+app = FastAPI(title="Neuro Server", lifespan=lifespan)
 
 # Allow all origins for testing
 app.add_middleware(
@@ -33,70 +71,25 @@ app.add_middleware(
 
 # In-memory storage of Brain instances per conversation
 brains: Dict[str, Brain] = {}
+# one NeuroFactory – and so one neuro watcher – shared by every conversation
+_factory: Optional[NeuroFactory] = None
+
+
+def _brain(cid: str) -> Brain:
+    global _factory
+    if cid not in brains:
+        if _factory is None:
+            _factory = NeuroFactory()
+        brains[cid] = Brain(_factory)
+    return brains[cid]
 
 # ----------------------------------------------------------------------------------
 # Neuro API Endpoints
 # ----------------------------------------------------------------------------------
 
-# Monkey patch the Executor.run method to explicitly emit replies
-from core.executor import Executor
-
-_original_run = Executor.run
-
-async def _patched_run(self):
-    conv = self.state.get("__conv")   # may be None in tests
-    node  = self.flow["start"]
-    nodes = self.flow["nodes"]
-
-    # Wrap the pub method to intercept 'assistant' messages
-    original_pub = self.pub
-    async def pub_wrapper(topic, data):
-        """
-        The Executor already publishes any assistant reply; emitting another
-        one here causes duplicate panels in the CLI.  Therefore we now simply
-        relay every node.* event unchanged.
-        """
-        await original_pub(topic, data)
-    
-    self.pub = pub_wrapper
-    
-    while node:
-        spec = nodes[node]                        # {neuro, params, next}
-        await self.pub("node.start", {"id": node, "neuro": spec["neuro"]})
-        try:
-            out = await self.factory.run(
-                spec["neuro"],
-                self.state,
-                **spec.get("params", {}),
-            )
-            self.state.update(out)
-        except Exception as e:
-            # ❶ standardised error payload
-            err_obj = {
-                "error": type(e).__name__,
-                "message": str(e),
-            }
-            # ❷ push a visible assistant message
-            await hub.queue(self.state.get("__cid", "default")).put({
-                "topic": "assistant",
-                "data": f"⚠️ {spec['neuro']} failed: {e}",
-            })
-            # ❸ still emit node.done so the client's wait logic un-blocks
-            await self.pub("node.done", {"id": node, "out": err_obj})
-            # ❹ re-raise so Executor/run() can abort the remaining DAG cleanly
-            raise
-        if conv and "reply" in out and isinstance(out["reply"], str):
-            conv.add("assistant", out["reply"])
-            await self.pub("assistant", out["reply"])   # 🔥 send to clients
-        await self.pub("node.done", {"id": node, "out": out})
-        node = spec.get("next")
-
-# Apply the monkey patch
-Executor.run = _patched_run
-
 async def _handle_and_emit(cid: str, text: str):
     """Run Brain.handle and push its textual reply (if any) to the hub."""
-    brain = brains.setdefault(cid, Brain())
+    brain = _brain(cid)
     
     # Use try-except to handle any errors in the brain processing
     try:
@@ -144,7 +137,11 @@ async def websocket_endpoint(ws: WebSocket, cid: str):
         
         while True:
             ev = await q.get()
-            logger.info(f"Sending event to client {cid}: {ev['topic']}")
+            # token deltas arrive many times a second – keep them out of INFO
+            if ev["topic"] == "assistant.delta":
+                logger.debug(f"Sending delta to client {cid}")
+            else:
+                logger.info(f"Sending event to client {cid}: {ev['topic']}")
             await ws.send_text(json.dumps(ev, default=str, ensure_ascii=False))
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for conversation: {cid}")
@@ -153,6 +150,45 @@ async def websocket_endpoint(ws: WebSocket, cid: str):
     finally:
         logger.info(f"WebSocket connection closed for conversation: {cid}")
 
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters for the LLM hot path."""
+    return {
+        "llm_cache":        llm_cache.stats(),
+        "llm_singleflight": llm_flights.stats(),
+        "llm_limits":       llm_limiter.stats(),
+        "llm_calls":        llm_metrics.stats(),
+        "llm_cassette":     llm_cassette.stats(),
+        "speculative_plan": speculation.stats(),
+        "intent_model":     intent_model.stats(),
+        "plan_cache":       plan_cache.stats(),
+        "neuro_memo":       neuro_memo.stats(),
+        "runs":             runs.stats(),
+        "neuro_pools":      neuro_pools.stats(),
+        "node_perf":        node_profiler.stats(),
+        "flow_compiler":    flow_compiler.stats(),
+        "neuros":           _factory.stats() if _factory is not None else {},
+    }
+
+@app.get("/metrics/llm")
+async def llm_call_metrics(neuro: Optional[str] = None, cid: Optional[str] = None,
+                           limit: int = 50):
+    """Per-neuro LLM histograms (or one neuro's) plus the most recent samples."""
+    return {
+        "stats":   llm_metrics.stats(neuro),
+        "samples": llm_metrics.samples(cid=cid, neuro=neuro, limit=limit),
+    }
+
+@app.get("/tasks/{cid}/state/{key}")
+async def task_state(cid: str, key: str):
+    """Full value behind a handle in a compacted event (see core.events)."""
+    brain = brains.get(cid)
+    task  = brain.tasks.get(cid) if brain else None
+    if task is None or key.startswith("__") or key not in task[1]:
+        raise HTTPException(status_code=404, detail=f"no state value '{key}' for {cid}")
+    body = json.dumps({"key": key, "value": task[1][key]}, default=str, ensure_ascii=False)
+    return Response(body, media_type="application/json")
+
 @app.get("/", response_class=HTMLResponse)
 async def home():
     """Simple home page with usage instructions"""
@@ -262,6 +298,21 @@ async def home():
                         <p>WebSocket connection for real-time updates</p>
                         <p>Connect to this endpoint to receive events from the Neuro brain.</p>
                     </div>
+
+                    <div class="endpoint">
+                        <span class="tag get">GET</span> <code>/metrics</code>
+                        <p>Runtime counters (LLM cache hits / misses, …)</p>
+                    </div>
+
+                    <div class="endpoint">
+                        <span class="tag get">GET</span> <code>/metrics/llm?neuro=…&amp;cid=…</code>
+                        <p>Per-neuro LLM latency histograms, token totals and recent calls</p>
+                    </div>
+
+                    <div class="endpoint">
+                        <span class="tag get">GET</span> <code>/tasks/{cid}/state/{key}</code>
+                        <p>Full value of a state key that an event only carried as a handle</p>
+                    </div>
                 </div>
             </div>
         </div>
@@ -286,13 +337,16 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        # watch these dirs (you can add others)
-        reload_dirs=[".", "neuros", "core", "profiles"],
+        # watch these dirs (you can add others) – not neuros/: NeuroFactory
+        # hot-reloads those in-process, no restart needed
+        reload_dirs=[".", "core", "profiles"],
         # include .py, .json, and .txt files too
         reload_includes=["*.py", "*.json", "*.txt"],
         # ignore generated or heavy folders
         reload_excludes=[
             "conversations/*",
+            ".cache/*",
+            "neuros",
             "**/__pycache__/*"
         ],
         # give a small pause on reload so clients get time to reconnect
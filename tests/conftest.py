@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# the suite runs from anywhere; core/ is imported as a top-level package
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core.cassette import Cassette, CassetteMiss
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+    def model_dump(self):
+        return {"text": self.text}
+
+
+def _real(calls: list):
+    def create(**kw):
+        calls.append(kw)
+        return iter([_Chunk("Hel"), _Chunk("lo")])
+    return lambda: SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def _ask(client):
+    return "".join(c.text for c in client.chat.completions.create(
+        model="m", messages=[{"role": "user", "content": "hi"}], stream=True))
+
+
+def test_sync_stream_records_then_replays(tmp_path):
+    path, calls = str(tmp_path / "tape.jsonl"), []
+
+    rec = Cassette(path, mode="record")
+    assert _ask(rec.wrap(_real(calls), is_async=False)) == "Hello"
+    assert len(calls) == 1 and rec.counters["recorded"] == 1
+
+    play = Cassette(path, mode="replay", latency="0")
+    assert _ask(play.wrap(_real(calls), is_async=False)) == "Hello"
+    assert len(calls) == 1 and play.counters["played"] == 1
+
+
+def test_sync_stream_replay_miss_raises(tmp_path):
+    play = Cassette(str(tmp_path / "empty.jsonl"), mode="replay")
+    with pytest.raises(CassetteMiss):
+        _ask(play.wrap(_real([]), is_async=False))
@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+
+from core import executor
+from core.executor import Executor
+from core.neuro_factory import NeuroTimeout
+
+
+class _Factory:
+    """compile_flow's surface plus a run() that sleeps a little."""
+    reg        = {"work": SimpleNamespace(inputs=[])}
+    signatures = {}
+    aliases    = {}
+
+    async def run(self, name, state, **kw):
+        await asyncio.sleep(0.01)
+        return {"done": True}
+
+
+def _run_flow():
+    events = []
+
+    async def pub(topic, data):
+        events.append(topic)
+
+    flow = {"start": ["a", "b", "c"], "nodes": {n: {"neuro": "work", "params": {}}
+                                               for n in "abc"}}
+    asyncio.run(Executor(flow, _Factory(), {}, pub).run())
+    return events
+
+
+def test_global_cap_works_across_event_loops(monkeypatch):
+    # a cap of 1 forces contention, which is what bound the old module-level semaphore
+    monkeypatch.setattr(executor, "_GLOBAL_PARALLEL", 1)
+    for _ in range(3):
+        assert _run_flow().count("node.done") == 3
+
+
+class _Failing(_Factory):
+    """First node raises *error*; the planner is recorded and gives up."""
+    def __init__(self, error):
+        self.error, self.planned = error, 0
+
+    async def run(self, name, state, **kw):
+        if name == "planner":
+            self.planned += 1
+            return {"plan": {"ok": False, "question": "stuck"}}
+        raise self.error
+
+    def catalogue(self, cid):
+        return []
+
+
+def _run_failing(error):
+    events, factory = [], _Failing(error)
+
+    async def pub(topic, data):
+        events.append((topic, data.get("reason") if isinstance(data, dict) else data))
+
+    flow = {"start": "a", "nodes": {"a": {"neuro": "work", "params": {}}}}
+    asyncio.run(Executor(flow, factory, {}, pub).run())
+    return events, factory.planned
+
+
+def test_conf_timeout_is_terminal():
+    events, planned = _run_failing(NeuroTimeout("work", 0.1))
+    assert planned == 0
+    assert ("node.cancelled", "timeout") in events
+
+
+def test_timeouts_raised_by_the_neuro_itself_are_replanned():
+    events, planned = _run_failing(TimeoutError("socket timed out"))
+    assert planned == 1
+    assert not any(t == "node.cancelled" for t, _ in events)
@@ -0,0 +1,131 @@
+import inspect
+from types import SimpleNamespace
+
+import pytest
+
+from core.flow_compiler import CompiledPlan, FlowError, compile_flow
+
+
+def _sig(src: str) -> inspect.Signature:
+    ns = {}
+    exec(f"async def run{src}: pass", ns)
+    return inspect.signature(ns["run"])
+
+
+class _Factory:
+    """Just the surface compile_flow reads: reg, signatures, aliases."""
+    def __init__(self):
+        self.reg = {
+            "search":          SimpleNamespace(inputs=["query"]),
+            "code_file_write": SimpleNamespace(inputs=["path", "content"]),
+            "resize":          SimpleNamespace(inputs={"width": "int", "keep": "bool"}),
+            "reply":           SimpleNamespace(inputs=["text"]),
+        }
+        self.signatures = {
+            "search":          _sig("(state, *, query, limit=5)"),
+            "code_file_write": _sig("(state, path, content='')"),
+            "resize":          _sig("(state, width, keep=False)"),
+            "reply":           _sig("(state, **kw)"),
+        }
+        self.aliases = {"write_file": "code_file_write"}
+
+
+def _node(neuro, params=None, nxt=None, **extra):
+    return {"neuro": neuro, "params": params or {}, "next": nxt, **extra}
+
+
+def test_linear_flow_compiles_in_order():
+    flow = {"start": "a", "nodes": {
+        "a": _node("search", {"query": "neo"}, "b"),
+        "b": _node("reply", {"text": "done"}),
+    }}
+    plan = compile_flow(flow, _Factory())
+    assert isinstance(plan, CompiledPlan)
+    assert plan.order == ("a", "b") and plan.repairs == ()
+    assert plan.preds["b"] == frozenset({"a"}) and plan.succ["a"] == ("b",)
+    assert plan.flow()["nodes"]["a"]["next"] == "b"
+
+
+def test_names_resolve_through_aliases_and_case():
+    flow = {"start": "a", "nodes": {
+        "a": _node("write_file", {"path": "x.py"}, "b"),
+        "b": _node("Reply"),
+    }}
+    plan = compile_flow(flow, _Factory())
+    assert plan.nodes["a"].neuro == "code_file_write"
+    assert plan.nodes["b"].neuro == "reply"
+    assert len(plan.repairs) == 2
+
+
+def test_params_are_checked_and_repaired():
+    flow = {"start": "a", "nodes": {
+        "a": _node("search", {"query": "neo", "verbose": True}, "b"),
+        "b": _node("resize", {"width": " 640 ", "keep": "yes"}, "c"),
+        "c": _node("reply", {"anything": 1}),
+    }}
+    plan = compile_flow(flow, _Factory())
+    assert dict(plan.nodes["a"].params) == {"query": "neo"}        # no **kw → dropped
+    assert dict(plan.nodes["b"].params) == {"width": 640, "keep": True}
+    assert dict(plan.nodes["c"].params) == {"anything": 1}          # **kw keeps it
+    with pytest.raises(TypeError):
+        plan.nodes["a"].params["query"] = "x"                       # immutable
+
+
+def test_missing_params_unknown_neuros_and_bad_types_are_errors():
+    flow = {"start": "a", "nodes": {
+        "a": _node("search", {}, "b"),
+        "b": _node("summon_dragon", {}, "c"),
+        "c": _node("resize", {"width": "wide"}),
+    }}
+    with pytest.raises(FlowError) as e:
+        compile_flow(flow, _Factory())
+    problems = "\n".join(e.value.problems)
+    assert "a: search needs query" in problems
+    assert "unknown neuro 'summon_dragon'" in problems
+    assert "resize.width should be int" in problems
+
+
+def test_dangling_edges_and_unreachable_nodes_are_dropped():
+    flow = {"start": "a", "nodes": {
+        "a": _node("reply", {}, ["b", "ghost"]),
+        "b": _node("reply", deps=["a", "phantom"]),
+        "island": _node("reply"),
+    }}
+    plan = compile_flow(flow, _Factory())
+    assert plan.order == ("a", "b") and "island" not in plan.nodes
+    assert any("ghost" in r for r in plan.repairs)
+    assert any("phantom" in r for r in plan.repairs)
+    assert any("island is unreachable" in r for r in plan.repairs)
+
+
+def test_parallel_branches_join_in_discovery_order():
+    flow = {"start": ["a", "b"], "max_parallel": "2", "nodes": {
+        "a": _node("reply", {}, "c"),
+        "b": _node("reply", {}, "c"),
+        "c": _node("reply", deps=["a", "b"]),
+    }}
+    plan = compile_flow(flow, _Factory())
+    assert plan.order == ("a", "b", "c") and plan.max_parallel == 2
+    assert plan.preds["c"] == frozenset({"a", "b"})
+
+
+def test_cycles_are_rejected():
+    flow = {"start": "a", "nodes": {
+        "a": _node("reply", {}, "b"),
+        "b": _node("reply", {}, "c"),
+        "c": _node("reply", {}, "b"),
+    }}
+    with pytest.raises(FlowError) as e:
+        compile_flow(flow, _Factory())
+    assert e.value.problems == ["cycle through b, c"]
+
+
+@pytest.mark.parametrize("flow", [
+    None,
+    {"start": "a", "nodes": {}},
+    {"start": "zz", "nodes": {"a": _node("reply")}},
+    {"start": "a", "nodes": {"a": "reply"}},
+])
+def test_malformed_flows_are_rejected(flow):
+    with pytest.raises(FlowError):
+        compile_flow(flow, _Factory())
@@ -0,0 +1,34 @@
+import asyncio
+import threading
+import time
+
+from core import history
+
+
+def test_settings_merge_profile_first_neuro_last():
+    profile = {"history": {"budget": 4000, "turns": 20, "model": "gpt-4o"}}
+    neuro   = {"history": {"budget": 1000}}
+    assert history.settings(profile, neuro) == {"budget": 1000, "turns": 20, "model": "gpt-4o"}
+    assert history.settings({"history": None}, neuro) == {"budget": 1000, "turns": 10}
+
+
+def test_encoding_is_never_resolved_on_the_event_loop(monkeypatch):
+    seen = []
+
+    class _Tiktoken:
+        @staticmethod
+        def encoding_for_model(model):
+            seen.append(threading.current_thread())
+            time.sleep(0.05)                     # stands in for the BPE download
+            return None
+
+    monkeypatch.setattr(history, "tiktoken", _Tiktoken)
+    monkeypatch.setattr(history, "_encodings", {})
+
+    async def main():
+        assert history.count_tokens("abcdefgh", "fake-model") == 2   # char estimate
+        while "fake-model" not in history._encodings:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert seen and threading.main_thread() not in seen
@@ -0,0 +1,32 @@
+from core.intent_model import IntentModel
+
+_DATA = [(f"hello there friend {i}", "greeting") for i in range(12)] + \
+        [(f"write a python script number {i}", "code") for i in range(12)]
+
+
+def _model(tmp_path, data):
+    m = IntentModel(str(tmp_path / "intent.npz"), str(tmp_path / "log.jsonl"),
+                    conv_dir=str(tmp_path), threshold=0.5)
+    m.examples = lambda: list(data)
+    return m
+
+
+def test_train_then_predict_and_reload(tmp_path):
+    m = _model(tmp_path, _DATA)
+    assert not m.ready
+    assert m.train(epochs=200)["ok"]
+    assert m.classify("hello there friend") == "greeting"
+
+    again = _model(tmp_path, [])
+    assert again.predict("write a python script")[0] == "code"
+
+
+def test_retrain_swaps_weights_and_labels_together(tmp_path):
+    m = _model(tmp_path, _DATA)
+    m.train(epochs=50)
+    before = m.model
+    m.examples = lambda: _DATA + [(f"stop the task now {i}", "cancel") for i in range(12)]
+    m.train(epochs=50)
+    W, b, labels = m.model
+    assert m.model is not before
+    assert W.shape[1] == b.shape[0] == len(labels) == 3
@@ -0,0 +1,60 @@
+import asyncio
+
+from core.llm_cache import LLMCache
+
+
+def test_disk_writes_are_batched_and_survive_restart(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    cache = LLMCache(path=path)
+    for i in range(200):
+        cache.put(f"k{i}", f"v{i}")
+    cache.disk.flush()
+    assert len(cache.disk) == 200
+    cache.close()
+
+    again = LLMCache(path=path)
+    assert again.get("k199") == "v199"
+    again.close()
+
+
+def test_aget_reads_disk_off_the_loop_and_promotes(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "llm.sqlite"))
+    cache.put("k", "v")
+    cache.disk.flush()
+    cache.memory.clear()
+
+    assert asyncio.run(cache.aget("k")) == "v"
+    assert cache.counters["hits_disk"] == 1
+    assert asyncio.run(cache.aget("k")) == "v"
+    assert cache.counters["hits_memory"] == 1
+    assert asyncio.run(cache.aget("missing")) is None
+    cache.close()
+
+
+def test_expired_disk_rows_miss(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "llm.sqlite"))
+    cache.disk.put("old", "v", expires=1.0)
+    cache.disk.flush()
+    assert asyncio.run(cache.aget("old")) is None
+    cache.close()
+
+
+def test_event_loop_never_opens_the_database(tmp_path, monkeypatch):
+    import sqlite3
+    import threading
+
+    opened = []
+    real = sqlite3.connect
+    monkeypatch.setattr(sqlite3, "connect",
+                        lambda *a, **k: opened.append(threading.current_thread()) or real(*a, **k))
+
+    async def main():
+        cache = LLMCache(path=str(tmp_path / "llm.sqlite"))
+        cache.put("k", "v")
+        cache.memory.clear()
+        assert await cache.aget("missing") is None
+        return cache
+
+    cache = asyncio.run(main())
+    cache.close()
+    assert opened and threading.main_thread() not in opened
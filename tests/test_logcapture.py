@@ -0,0 +1,31 @@
+import asyncio
+
+from core import logcapture
+
+
+def test_console_bypasses_the_task_buffer(capsys):
+    with logcapture.capture() as buf:
+        print("from the neuro")
+        logcapture.console("[BRAIN] diagnostics")
+    assert buf.getvalue() == "from the neuro\n"
+    assert "[BRAIN] diagnostics" in capsys.readouterr().out
+
+
+def test_concurrent_tasks_keep_their_own_output():
+    async def neuro(tag):
+        with logcapture.capture() as buf:
+            for i in range(3):
+                print(f"{tag}{i}")
+                await asyncio.sleep(0)
+            return buf.getvalue()
+
+    async def main():
+        return await asyncio.gather(neuro("a"), neuro("b"))
+
+    assert asyncio.run(main()) == ["a0\na1\na2\n", "b0\nb1\nb2\n"]
+
+
+def test_buffer_is_capped():
+    with logcapture.capture(limit=5) as buf:
+        print("0123456789", end="")
+    assert buf.getvalue() == "01234\n… [+5 chars dropped]"
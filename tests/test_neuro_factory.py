@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+import pytest
+
+from core import neuro_manifest
+from core.neuro_factory import NeuroFactory, NeuroTimeout
+
+_SLOW = '''
+import asyncio
+
+async def run(state, *, inner=None, **kw):
+    if inner:
+        async with asyncio.timeout(inner):      # the neuro's own timeout
+            await asyncio.sleep(5)
+    await asyncio.sleep(5)
+'''
+
+
+@pytest.fixture
+def neuros(tmp_path, monkeypatch):
+    monkeypatch.setattr(neuro_manifest.manifest, "path", str(tmp_path / "manifest.json"))
+    folder = tmp_path / "neuros" / "slow"
+    folder.mkdir(parents=True)
+    (folder / "conf.json").write_text(json.dumps({
+        "name": "slow", "description": "sleeps", "inputs": [], "outputs": [], "timeout": 0.05}))
+    (folder / "code.py").write_text(_SLOW)
+    return str(tmp_path / "neuros")
+
+
+def _run(neuros, **kw):
+    async def main():
+        factory = NeuroFactory(neuros)          # watches the folder – needs the loop
+        try:
+            return await factory.run("slow", {}, **kw)
+        finally:
+            factory.close()
+    return asyncio.run(main())
+
+
+def test_conf_timeout_raises_neuro_timeout(neuros):
+    with pytest.raises(NeuroTimeout) as e:
+        _run(neuros)
+    assert e.value.neuro == "slow" and e.value.limit == 0.05
+
+
+def test_neuro_own_timeout_stays_a_plain_timeout_error(neuros):
+    with pytest.raises(TimeoutError) as e:
+        _run(neuros, inner=0.01)
+    assert not isinstance(e.value, NeuroTimeout)
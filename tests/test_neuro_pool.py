@@ -0,0 +1,37 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from core import neuro_pool
+from core.neuro_pool import NeuroPools, _proc_run
+
+_CODE = '''
+async def run(state, **kw):
+    state["items"].append(kw["x"])      # in-place edit of an existing key
+    state["fresh"] = 1                  # new key
+    print("ran")
+    return {"ok": True}
+'''
+
+
+def test_proc_run_reports_in_place_edits(monkeypatch):
+    monkeypatch.setattr("core.base_brain.get_brain", lambda *a: None)
+    state = {"items": [1], "same": {"a": 1}}
+    res, logs, writes, _ = _proc_run("t", "digest-t", _CODE, ("m", 0.0, None), None,
+                                     state, {"x": 2}, None)
+    assert res == {"ok": True}
+    assert logs == "ran\n"
+    assert writes == {"items": [1, 2], "fresh": 1}
+
+
+def test_workers_start_on_first_dispatch_only(monkeypatch):
+    warmed = []
+    monkeypatch.setattr(NeuroPools, "warm", lambda self: warmed.append(1))
+    monkeypatch.setattr(NeuroPools, "procs", property(lambda self: ThreadPoolExecutor(1)))
+    monkeypatch.setattr(neuro_pool, "_proc_run",
+                        lambda *a: ({"ok": True}, "", {"fresh": 1}, 0.0))
+    pools, state = NeuroPools(processes=1), {"a": 1}
+    assert not warmed
+
+    res = asyncio.run(pools.process("t", "d", "", ("m", 0.0, None), None, state, {}))
+    assert res == {"ok": True} and state == {"a": 1, "fresh": 1}
+    assert warmed == [1]
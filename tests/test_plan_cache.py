@@ -0,0 +1,65 @@
+from core.plan_cache import PlanCache, normalize
+
+
+def _flow(params: dict) -> dict:
+    return {"start": "n1", "nodes": {"n1": {"neuro": "calc", "params": params, "next": None}}}
+
+
+def _roundtrip(stored_goal, params, new_goal):
+    pc = PlanCache()
+    key = pc.key(stored_goal, "general", "fp")
+    assert key == pc.key(new_goal, "general", "fp")
+    pc.put(key, stored_goal, _flow(params))
+    hit = pc.get(key, new_goal)
+    return hit and hit["nodes"]["n1"]["params"], pc
+
+
+def test_normalize_lifts_literals_into_slots():
+    assert normalize('Open "~/code/neo" in VSCode!') == ("open <0> in vscode", ["~/code/neo"])
+    assert normalize("is 7 prime") == ("is <0> prime", ["7"])
+
+
+def test_numeric_params_are_slotted():
+    params, _ = _roundtrip("is 7 prime", {"n": 7}, "is 8 prime")
+    assert params == {"n": 8}
+    params, _ = _roundtrip("scale by 1.5 please", {"factor": 1.5}, "scale by 2.25 please")
+    assert params == {"factor": 2.25}
+
+
+def test_booleans_are_never_slotted():
+    params, _ = _roundtrip("show 1 result please", {"n": 1, "verbose": True},
+                           "show 3 result please")
+    assert params == {"n": 3, "verbose": True}
+
+
+def test_string_slots_and_whole_goal_are_filled():
+    params, _ = _roundtrip('open "a.py" in vscode', {"path": "a.py"}, 'open "b.py" in vscode')
+    assert params == {"path": "b.py"}
+    params, _ = _roundtrip("is 7 prime", {"question": "is 7 prime"}, "is 8 prime")
+    assert params == {"question": "is 8 prime"}
+
+
+def test_hit_refused_when_a_slot_value_is_baked_in():
+    # "7" is too short to be swapped inside a longer string
+    params, pc = _roundtrip("is 7 prime", {"question": "check whether 7 is prime"}, "is 8 prime")
+    assert params is None
+    assert pc.counters["refused"] == 1 and pc.counters["hits"] == 0
+    # …but the very same value still hits
+    key = pc.key("is 7 prime", "general", "fp")
+    assert pc.get(key, "is 7 prime")["nodes"]["n1"]["params"] == {
+        "question": "check whether 7 is prime"}
+
+
+def test_contextual_goals_get_no_key():
+    pc = PlanCache()
+    for goal in ("yes", "Yes!", "do it again", "fix that bug now", "ok go"):
+        assert pc.key(goal, "general", "fp") is None, goal
+    assert pc.key("summarise the latest AI news", "general", "fp") is not None
+    assert pc.counters["contextual"] == 5
+
+
+def test_key_depends_on_profile_and_fingerprint():
+    pc = PlanCache()
+    goal = "summarise the latest AI news"
+    assert pc.key(goal, "general", "fp") != pc.key(goal, "coding", "fp")
+    assert pc.key(goal, "general", "fp") != pc.key(goal, "general", "fp2")
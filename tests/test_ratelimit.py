@@ -0,0 +1,82 @@
+import asyncio
+
+import httpx
+import pytest
+from openai import APIConnectionError, RateLimitError
+
+from core import context
+from core.ratelimit import RateLimiter
+
+_REQ = httpx.Request("POST", "https://api.example/v1/chat/completions")
+
+
+def _conn_error():
+    return APIConnectionError(message="reset", request=_REQ)
+
+
+def _rate_limited(retry_after: str):
+    resp = httpx.Response(429, headers={"retry-after": retry_after}, request=_REQ)
+    return RateLimitError("slow down", response=resp, body=None)
+
+
+def _flaky(errors: list, result="ok"):
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+    return fn, calls
+
+
+def test_retries_until_success():
+    rl = RateLimiter(base_delay=0.001, max_retries=3)
+    fn, calls = _flaky([_conn_error(), _conn_error()])
+    info = {}
+    assert asyncio.run(rl.retry("m", fn, info)) == "ok"
+    assert len(calls) == 3 and info["retries"] == 2
+    assert rl.model("m").counters["retries"] == 2
+
+
+def test_gives_up_when_backoff_reaches_the_deadline():
+    async def main():
+        rl = RateLimiter(max_retries=5)
+        fn, calls = _flaky([_rate_limited("5")])
+        loop = asyncio.get_running_loop()
+        with context.scope(deadline=loop.time() + 1.0):
+            t0 = loop.time()
+            with pytest.raises(RateLimitError):
+                await rl.retry("m", fn)
+            assert loop.time() - t0 < 0.5           # did not sleep for Retry-After
+        assert len(calls) == 1
+        assert rl.model("m").counters == {"requests": 0, "retries": 0, "throttled": 0,
+                                          "gave_up": 1}
+    asyncio.run(main())
+
+
+def test_retries_when_backoff_fits_before_the_deadline():
+    async def main():
+        rl = RateLimiter(max_retries=5)
+        fn, calls = _flaky([_rate_limited("0.01")])
+        with context.scope(deadline=asyncio.get_running_loop().time() + 5.0):
+            assert await rl.retry("m", fn) == "ok"
+        assert len(calls) == 2
+        assert rl.model("m").counters["throttled"] == 1
+    asyncio.run(main())
+
+
+def test_non_retryable_errors_raise_immediately():
+    rl = RateLimiter(base_delay=0.001)
+    fn, calls = _flaky([ValueError("bad request")])
+    with pytest.raises(ValueError):
+        asyncio.run(rl.retry("m", fn))
+    assert len(calls) == 1 and rl.model("m").counters["gave_up"] == 0
+
+
+def test_retries_run_out():
+    rl = RateLimiter(base_delay=0.001, max_retries=2)
+    fn, calls = _flaky([_conn_error() for _ in range(5)])
+    with pytest.raises(APIConnectionError):
+        asyncio.run(rl.retry("m", fn))
+    assert len(calls) == 3 and rl.model("m").counters["gave_up"] == 1
@@ -0,0 +1,61 @@
+import threading
+
+from core import run_store
+from core.run_store import RunStore
+
+
+_FLOW = {"start": "a", "nodes": {}}
+
+
+def _save(store, run_id, state, checkpoints=None):
+    store.save(run_id, cid="c1", profile="general", flow=_FLOW,
+               state=state, checkpoints=checkpoints or {}, running={"a"})
+
+
+def test_round_trip_keeps_only_json_state(tmp_path):
+    store = RunStore(str(tmp_path))
+    lock = threading.Lock()
+    _save(store, "r1", {"goal": "hi", "n": [1, 2], "__conv": object(), "lock": lock},
+          {"sig": ({"reply": "ok"}, {"x": 1}), "bad": ({"lock": lock}, {})})
+    (rec,) = store.pending()
+    assert rec["state"] == {"goal": "hi", "n": [1, 2]}
+    assert rec["checkpoints"] == {"sig": ({"reply": "ok"}, {"x": 1})}
+    assert rec["running"] == ["a"] and rec["cid"] == "c1"
+
+    store.drop("r1")
+    assert store.pending() == []
+
+
+def test_each_value_is_encoded_once_and_reused(tmp_path, monkeypatch):
+    calls = []
+    real = run_store._dumps
+    monkeypatch.setattr(run_store, "_dumps", lambda v: calls.append(v) or real(v))
+    store = RunStore(str(tmp_path))
+    text, items, lock = "x" * 1000, [1], threading.Lock()
+    state = {"text": text, "items": items, "lock": lock}
+    ckpt = {"s": ({"out": 1}, {})}
+
+    _save(store, "r1", state, ckpt)
+    assert len(calls) == 5                     # flow, 3 state values, 1 checkpoint
+    calls.clear()
+    items.append(2)                            # mutable → encoded again
+    _save(store, "r1", state, ckpt)
+    assert calls == [[1, 2]]
+    (rec,) = store.pending()
+    assert rec["state"] == {"text": text, "items": [1, 2]}
+
+
+def test_saves_are_coalesced_per_run(tmp_path):
+    store = RunStore(str(tmp_path))
+    for i in range(50):
+        _save(store, "r1", {"i": i})
+    store.flush()
+    (rec,) = store.pending()
+    assert rec["state"] == {"i": 49}
+    assert store.counters["saves"] == 50 and store.counters["writes"] <= 50
+
+
+def test_disabled_store_writes_nothing(tmp_path):
+    store = RunStore(str(tmp_path), enabled=False)
+    _save(store, "r1", {"i": 1})
+    assert store.pending() == [] and not list(tmp_path.iterdir())
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from core.singleflight import SingleFlight
+
+
+def _work(started: list, release: asyncio.Event, result="done"):
+    async def fn():
+        started.append(1)
+        try:
+            await release.wait()
+        except asyncio.CancelledError:
+            started.append("cancelled")
+            raise
+        return result
+    return fn
+
+
+def test_identical_calls_share_one_execution():
+    async def main():
+        sf, started, release = SingleFlight(), [], asyncio.Event()
+        a = asyncio.create_task(sf.do("k", _work(started, release)))
+        b = asyncio.create_task(sf.do("k", _work(started, release)))
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(a, b) == ["done", "done"]
+        assert started == [1]
+        assert sf.counters["saved"] == 1 and sf.in_flight() == 0
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_work_running_for_the_others():
+    async def main():
+        sf, started, release = SingleFlight(), [], asyncio.Event()
+        leader = asyncio.create_task(sf.do("k", _work(started, release)))
+        follower = asyncio.create_task(sf.do("k", _work(started, release)))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+        assert await follower == "done"
+        assert "cancelled" not in started
+        assert sf.counters["abandoned"] == 0
+    asyncio.run(main())
+
+
+def test_work_is_cancelled_once_every_waiter_is_gone():
+    async def main():
+        sf, started, release = SingleFlight(), [], asyncio.Event()
+        tasks = [asyncio.create_task(sf.do("k", _work(started, release))) for _ in range(3)]
+        await asyncio.sleep(0)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert started == [1, "cancelled"]
+        assert sf.counters["abandoned"] == 1 and sf.in_flight() == 0
+
+        # the key is free again – the next caller leads a fresh call
+        release.set()
+        assert await sf.do("k", _work(started, release, "again")) == "again"
+    asyncio.run(main())
+
+
+def test_errors_reach_every_waiter():
+    async def main():
+        sf = SingleFlight()
+
+        async def boom():
+            await asyncio.sleep(0)
+            raise RuntimeError("upstream")
+        results = await asyncio.gather(sf.do("k", boom), sf.do("k", boom),
+                                       return_exceptions=True)
+        assert [type(r) for r in results] == [RuntimeError, RuntimeError]
+        assert sf.counters["leaders"] == 1
+    asyncio.run(main())